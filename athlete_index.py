@@ -0,0 +1,317 @@
+# athlete_index.py
+
+import numpy as np
+import pandas as pd
+
+import tracing
+from medal_cube import MEDALS
+
+# Columns the index is built from
+INDEX_COLUMNS = ['ID', 'Name', 'NOC', 'Games', 'Year', 'Season', 'Sport', 'Event', 'Medal']
+
+
+def _postings(codes, size):
+    # Inverted index as (order, offsets): the rows holding code c are
+    # order[offsets[c]:offsets[c + 1]], in ascending row order
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=size), out=offsets[1:])
+    return order, offsets
+
+
+def _ranges(sorted_codes, size):
+    # Start and end row of every code in an array sorted by code
+    return np.searchsorted(sorted_codes, np.arange(size + 1))
+
+
+def _codes(values):
+    # Integer codes and their labels, with labels in sorted order so they
+    # can be looked up by binary search
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques)
+    order = np.argsort(uniques, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    dtype = np.int16 if len(uniques) < 2 ** 15 else np.int32
+    return rank[codes].astype(dtype), uniques[order]
+
+
+def _position(labels, value):
+    # Position of value in sorted labels; KeyError when absent
+    i = int(np.searchsorted(labels, value))
+    if i == len(labels) or labels[i] != value:
+        raise KeyError(value)
+    return i
+
+
+class _Strings:
+    # Strings stored as UTF-8 bytes plus offsets, so they can live in a
+    # memory-mapped file; indexing decodes only the strings asked for
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def encode(cls, values):
+        encoded = [str(v).encode('utf-8') for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        idx = np.atleast_1d(idx)
+        return np.array([bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8') for i in idx],
+                        dtype=object)
+
+
+def _build(df):
+    # Arrays and labels of an index over the athlete rows in df
+    sport, sports = _codes(df['Sport'])
+    event, event_names = _codes(df['Event'])
+    # Events are numbered by (sport, event) so each sport's events are adjacent
+    pair, pairs = pd.factorize(sport.astype(np.int64) * len(event_names) + event, sort=True)
+    year = df['Year'].to_numpy(dtype=np.int16)
+    season, season_names = _codes(df['Season'])
+    order = np.lexsort((season, year, pair))
+
+    a = {
+        'sport': sport[order],
+        'event': pair[order].astype(np.int32),
+        'event_sport': pairs // len(event_names),
+        'year': year[order],
+        'season': season[order],
+    }
+    a['noc'], nocs = _codes(df['NOC'].to_numpy()[order])
+    a['games'], games_names = _codes(df['Games'].to_numpy()[order])
+    a['medal'] = pd.Categorical(df['Medal'].to_numpy()[order], categories=MEDALS).codes.astype(np.int8)
+
+    athlete, a['athlete_ids'] = _codes(df['ID'].to_numpy()[order])
+    a['athlete'] = athlete.astype(np.int32)
+    first = np.unique(a['athlete'], return_index=True)[1]
+    a['athlete_names'] = df['Name'].to_numpy()[order][first]
+    a['athlete_nocs'] = a['noc'][first]
+
+    a['sport_rows'] = _ranges(a['sport'], len(sports))
+    a['event_rows'] = _ranges(a['event'], len(pairs))
+    a['athlete_order'], a['athlete_offsets'] = _postings(a['athlete'], len(a['athlete_ids']))
+    a['games_order'], a['games_offsets'] = _postings(a['games'], len(games_names))
+
+    # Rows counted in 'nation' mode: a team medal once per Games, event and NOC
+    medalled = a['medal'] >= 0
+    rows = np.flatnonzero(medalled)
+    key = ((a['games'][rows].astype(np.int64) * len(pairs) + a['event'][rows]) * len(nocs)
+           + a['noc'][rows]) * len(MEDALS) + a['medal'][rows]
+    a['nation_rows'] = np.zeros(len(medalled), dtype=bool)
+    a['nation_rows'][rows[~pd.Series(key).duplicated().to_numpy()]] = True
+    a['medalled'] = medalled
+
+    labels = {
+        'sports': sports,
+        'event_names': event_names[pairs % len(event_names)],
+        'season_names': season_names,
+        'nocs': nocs,
+        'games_names': games_names,
+    }
+    return a, labels
+
+
+class AthleteIndex:
+    # Athlete rows held as integer codes, sorted by Sport, Event and Games so
+    # that every sport and every event is one contiguous row range. Athlete
+    # IDs and Games map to their rows through inverted indexes, so a filter
+    # touches only the rows it selects. Medal queries take the same
+    # 'athlete' / 'nation' counting modes as the medal tables.
+    #
+    # All state is plain arrays (to_arrays / from_arrays), so an index built
+    # in one process can be memory-mapped read-only by others.
+
+    ARRAYS = ('sport', 'event', 'event_sport', 'year', 'season', 'noc', 'games', 'medal',
+              'athlete', 'athlete_ids', 'athlete_nocs', 'sport_rows', 'event_rows',
+              'athlete_order', 'athlete_offsets', 'games_order', 'games_offsets',
+              'nation_rows', 'medalled')
+    LABELS = ('sports', 'event_names', 'season_names', 'nocs', 'games_names')
+
+    def __init__(self, arrays, labels):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        for name in self.LABELS:
+            setattr(self, name, np.asarray(labels[name], dtype=object))
+        if 'athlete_names' in arrays:
+            self.athlete_names = arrays['athlete_names']
+        else:
+            self.athlete_names = _Strings(arrays['name_data'], arrays['name_offsets'])
+        self.athlete_postings = (self.athlete_order, self.athlete_offsets)
+        self.games_postings = (self.games_order, self.games_offsets)
+        self._event_keys = {(self.sports[s], e): j for j, (s, e) in enumerate(zip(self.event_sport, self.event_names))}
+        self._events_by_name = {}
+        for (_, event), j in self._event_keys.items():
+            self._events_by_name.setdefault(event, []).append(j)
+        self._athlete_totals = None
+        if 'top_athletes' in arrays:
+            self._athlete_totals = arrays['top_athletes'], arrays['top_counts'], arrays['top_ranked']
+
+    @classmethod
+    @tracing.traced('aggregate.athlete_index')
+    def from_frame(cls, df):
+        return cls(*_build(df[INDEX_COLUMNS]))
+
+    def to_arrays(self):
+        # (arrays, labels): numeric arrays, and the short label lists
+        self._all_athletes()
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.ARRAYS}
+        names = self.athlete_names
+        if not isinstance(names, _Strings):
+            names = _Strings.encode(names)
+        arrays['name_data'], arrays['name_offsets'] = names.data, names.offsets
+        arrays['top_athletes'], arrays['top_counts'], arrays['top_ranked'] = self._athlete_totals
+        labels = {name: [str(v) for v in getattr(self, name)] for name in self.LABELS}
+        return arrays, labels
+
+    def __len__(self):
+        return len(self.sport)
+
+    def events(self, sport):
+        i = _position(self.sports, sport)
+        return list(self.event_names[self.event_sport == i])
+
+    def _sport_range(self, sport):
+        i = _position(self.sports, sport)
+        return self.sport_rows[i], self.sport_rows[i + 1]
+
+    def _event_range(self, sport, event):
+        # Without a sport, the event name must belong to a single sport
+        if sport is None:
+            found = self._events_by_name.get(event)
+            if not found:
+                raise KeyError(event)
+            if len(found) > 1:
+                raise ValueError(f"Event '{event}' is held in several sports; give the sport too")
+            j = found[0]
+        else:
+            j = self._event_keys[(sport, event)]
+        return self.event_rows[j], self.event_rows[j + 1]
+
+    @staticmethod
+    def _posting(postings, i):
+        order, offsets = postings
+        return order[offsets[i]:offsets[i + 1]]
+
+    def rows(self, sport=None, event=None, games=None, athlete=None):
+        # Positions of the rows matching every given filter. Sport and event
+        # are row ranges; Games and athlete are posting lists, intersected.
+        lo, hi = 0, len(self)
+        if event is not None:
+            lo, hi = self._event_range(sport, event)
+        elif sport is not None:
+            lo, hi = self._sport_range(sport)
+        selected = None
+        for postings, labels, value in ((self.games_postings, self.games_names, games),
+                                        (self.athlete_postings, self.athlete_ids, athlete)):
+            if value is None:
+                continue
+            found = self._posting(postings, _position(labels, value))
+            selected = found if selected is None else np.intersect1d(selected, found, assume_unique=True)
+        if selected is None:
+            return np.arange(lo, hi)
+        if lo or hi != len(self):
+            start, end = np.searchsorted(selected, [lo, hi])
+            selected = selected[start:end]
+        return selected
+
+    def _medal_rows(self, rows, mode):
+        counted = self.nation_rows if mode == 'nation' else self.medalled
+        return rows[counted[rows]]
+
+    def _medal_table(self, codes, medals, size):
+        cell = codes.astype(np.int64) * len(MEDALS) + medals
+        return np.bincount(cell, minlength=size * len(MEDALS)).reshape(size, len(MEDALS))
+
+    @staticmethod
+    def _ranked(counts, n=None):
+        # Rows of counts with any medal, gold first, then silver, then bronze.
+        # With n, only the best n are partitioned out and sorted.
+        candidates = np.flatnonzero(counts.sum(axis=1))
+        if n is not None and len(candidates) > n:
+            base = int(counts.max()) + 1
+            score = (counts[candidates, 0] * base + counts[candidates, 1]) * base + counts[candidates, 2]
+            candidates = np.sort(candidates[np.argpartition(-score, n - 1)[:n]])
+        return candidates[np.lexsort((-counts[candidates, 2], -counts[candidates, 1], -counts[candidates, 0]))]
+
+    def _athlete_table(self, athletes, counts, ranked, n):
+        top = ranked[:n]
+        codes = athletes[top]
+        data = pd.DataFrame(counts[top], columns=MEDALS)
+        data.insert(0, 'NOC', self.nocs[self.athlete_nocs[codes]])
+        data.insert(0, 'Name', self.athlete_names[codes])
+        data.insert(0, 'ID', self.athlete_ids[codes])
+        data['Total'] = data[MEDALS].sum(axis=1)
+        return data
+
+    @tracing.traced('query.top_athletes')
+    def top_athletes(self, n=10, sport=None, event=None, games=None):
+        # Athletes with the most medals, ranked gold first. Every medal an
+        # athlete won counts, team medals included.
+        if sport is None and event is None and games is None:
+            return self._athlete_table(*self._all_athletes(), n)
+        rows = self._medal_rows(self.rows(sport, event, games), 'athlete')
+        athletes, counts = self._athlete_counts(rows)
+        return self._athlete_table(athletes, counts, self._ranked(counts, n), n)
+
+    def _all_athletes(self):
+        # The unfiltered table is the common case; it is counted once
+        if self._athlete_totals is None:
+            athletes, counts = self._athlete_counts(np.flatnonzero(self.medalled))
+            self._athlete_totals = athletes, counts, self._ranked(counts)
+        return self._athlete_totals
+
+    def _athlete_counts(self, rows):
+        # Medal counts for just the athletes in rows
+        athletes, codes = np.unique(self.athlete[rows], return_inverse=True)
+        return athletes, self._medal_table(codes, self.medal[rows], len(athletes))
+
+    @tracing.traced('query.country_strength')
+    def country_strength(self, sport, mode='athlete', games=None):
+        # Medals per NOC in one sport, with each country's share of the
+        # sport's medals
+        rows = self._medal_rows(self.rows(sport, games=games), mode)
+        counts = self._medal_table(self.noc[rows], self.medal[rows], len(self.nocs))
+        totals = counts.sum(axis=1)
+        active = self._ranked(counts)
+        data = pd.DataFrame(counts[active], columns=MEDALS)
+        data.insert(0, 'NOC', self.nocs[active])
+        data['Total'] = totals[active]
+        data['Share'] = data['Total'] / max(int(totals.sum()), 1)
+        return data
+
+    @tracing.traced('query.event_history')
+    def event_history(self, sport, event, mode='athlete'):
+        # Medallists of one event at every Games, latest first
+        rows = self._medal_rows(self.rows(sport, event), mode)
+        rows = rows[np.lexsort((self.medal[rows], -self.year[rows].astype(np.int32)))]
+        return self._result_frame(rows, athletes=(mode == 'athlete'))
+
+    @tracing.traced('query.athlete_results')
+    def athlete_results(self, athlete_id):
+        # Every row of one athlete, medals or not, in Games order
+        rows = self.rows(athlete=athlete_id)
+        rows = rows[np.lexsort((self.event[rows], self.year[rows]))]
+        data = self._result_frame(rows, athletes=False)
+        data.insert(3, 'Sport', self.sports[self.sport[rows]])
+        return data
+
+    def _result_frame(self, rows, athletes=True):
+        medal = self.medal[rows]
+        data = pd.DataFrame({
+            'Year': self.year[rows],
+            'Season': self.season_names[self.season[rows]],
+            'Games': self.games_names[self.games[rows]],
+            'Event': self.event_names[self.event[rows]],
+            'Medal': np.where(medal >= 0, np.asarray(MEDALS, dtype=object)[medal], None),
+            'NOC': self.nocs[self.noc[rows]],
+        })
+        if athletes:
+            data['Name'] = self.athlete_names[self.athlete[rows]]
+        return data
@@ -0,0 +1,159 @@
+# backtest.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from forecasters import GAMES_INTERVAL, get_forecaster
+from medal_cube import as_medal_cube
+
+DEFAULT_MODELS = ('wls', 'polynomial', 'holt')
+DEFAULT_CUTOFFS = 20
+MIN_HISTORY = 2
+
+# Set once per worker process by _init_worker
+_totals = None
+_years = None
+_nocs = None
+
+
+def _init_worker(totals, years, nocs):
+    # Workers receive the (Season x NOC x Year) totals once and slice every
+    # cutoff from them
+    global _totals, _years, _nocs
+    _totals, _years, _nocs = totals, years, nocs
+
+
+def parse_model(spec):
+    # 'holt' or 'holt:alpha=0.3,beta=0.1'
+    name, _, settings = spec.partition(':')
+    params = {}
+    for item in filter(None, settings.split(',')):
+        key, _, value = item.partition('=')
+        try:
+            value = int(value)
+        except ValueError:
+            try:
+                value = float(value)
+            except ValueError:
+                value = None if value == 'None' else value
+        params[key.strip()] = value
+    return get_forecaster(name.strip(), **params)
+
+
+def model_label(forecaster):
+    settings = ','.join(f"{k}={v}" for k, v in sorted(forecaster.params.items()))
+    return f"{forecaster.name}:{settings}" if settings else forecaster.name
+
+
+def cutoff_years(years, cutoffs=DEFAULT_CUTOFFS):
+    # The latest Games years whose next Games (year + 4) also took place;
+    # years holds the Games of one season
+    years = np.asarray(years)
+    valid = years[np.isin(years + GAMES_INTERVAL, years)]
+    return valid[-cutoffs:] if cutoffs else valid
+
+
+def _series_at(season, cutoff):
+    # Every country that won medals at the cutoff, with its history of the
+    # same season's Games up to it. Summer and Winter Games alternate since
+    # 1994, so mixing them would make every series zig-zag.
+    k = int(np.searchsorted(_years, cutoff))
+    window = _totals[season, :, :k + 1]
+    rows, series = [], []
+    for i in np.flatnonzero(window[:, k] > 0):
+        active = np.flatnonzero(window[i] > 0)
+        if len(active) >= MIN_HISTORY:
+            rows.append(i)
+            series.append((_nocs[i], _years[active].tolist(), window[i, active].tolist()))
+    return rows, series
+
+
+def _backtest_job(forecaster, season, cutoff):
+    start = time.perf_counter()
+    indices, series = _series_at(season, cutoff)
+    if not series:
+        return [], time.perf_counter() - start
+    results = forecaster.forecast(series)
+    target = int(np.searchsorted(_years, cutoff + GAMES_INTERVAL))
+    rows = [
+        (result['code'], cutoff, cutoff + GAMES_INTERVAL, result['yhat'][1],
+         result['yhat_lower'][1], result['yhat_upper'][1], int(_totals[season, i, target]))
+        for i, result in zip(indices, results)
+    ]
+    return rows, time.perf_counter() - start
+
+
+def _summarize(predictions, keys):
+    grouped = predictions.groupby(keys, sort=True)
+    summary = pd.DataFrame({
+        'Forecasts': grouped.size(),
+        'MAE': grouped['Absolute Error'].mean(),
+        'RMSE': np.sqrt(grouped['Squared Error'].mean()),
+        'Bias': grouped['Error'].mean(),
+        'Coverage': grouped['Covered'].mean(),
+    })
+    return summary.reset_index()
+
+
+def run_backtest(historical_df, models=DEFAULT_MODELS, cutoffs=DEFAULT_CUTOFFS, max_workers=None):
+    # Expanding-window replay, per season: for every cutoff Games t and
+    # every country that won medals at t, forecast the season's next Games
+    # t + 4 from its Games up to t. Returns per-forecast predictions and
+    # MAE / 80% interval coverage per model and season, and per model,
+    # season and country.
+    cube = as_medal_cube(historical_df)
+    totals = np.ascontiguousarray(cube.counts.sum(axis=3).transpose(2, 0, 1))
+    years = np.asarray(cube.years)
+    nocs = np.asarray(cube.nocs)
+    seasons = list(cube.seasons)
+    forecasters = [parse_model(m) if isinstance(m, str) else get_forecaster(m) for m in models]
+    jobs = [(f, s, int(t)) for f in forecasters for s in range(len(seasons))
+            for t in cutoff_years(years[totals[s].any(axis=0)], cutoffs)]
+
+    rows, fit_seconds = [], {}
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1) or 1
+    if workers == 1:
+        _init_worker(totals, years, nocs)
+        done = ((job, _backtest_job(*job)) for job in jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(totals, years, nocs))
+        futures = {pool.submit(_backtest_job, *job): job for job in jobs}
+        done = ((futures[f], f.result()) for f in as_completed(futures))
+
+    try:
+        for i, ((forecaster, season, cutoff), (job_rows, seconds)) in enumerate(done, 1):
+            label = model_label(forecaster)
+            rows.extend((label, seasons[season]) + row for row in job_rows)
+            key = (label, seasons[season])
+            fit_seconds[key] = fit_seconds.get(key, 0.0) + seconds
+            print(f"\r[{i}/{len(jobs)}] {label} through {cutoff} {seasons[season]}", end='', flush=True)
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    print()
+
+    predictions = pd.DataFrame(rows, columns=['Model', 'Season', 'NOC', 'Cutoff', 'Year', 'Prediction',
+                                              'Lower Bound', 'Upper Bound', 'Actual'])
+    predictions['Error'] = predictions['Prediction'] - predictions['Actual']
+    predictions['Absolute Error'] = predictions['Error'].abs()
+    predictions['Squared Error'] = predictions['Error'] ** 2
+    predictions['Covered'] = predictions['Actual'].between(predictions['Lower Bound'], predictions['Upper Bound'])
+
+    by_model = _summarize(predictions, ['Model', 'Season'])
+    by_model['Fit Seconds'] = [fit_seconds[key] for key in zip(by_model['Model'], by_model['Season'])]
+    by_country = _summarize(predictions, ['Model', 'Season', 'NOC'])
+    return predictions, by_model.sort_values(['Season', 'MAE']).reset_index(drop=True), by_country
+
+
+def write_backtest(predictions, by_model, by_country, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, table in (('predictions', predictions), ('models', by_model), ('countries', by_country)):
+        path = os.path.join(output_dir, f"backtest_{name}.csv")
+        table.to_csv(path, index=False)
+        paths.append(path)
+    return paths
@@ -0,0 +1,170 @@
+# batch_report.py
+
+import contextlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+REPORT_TYPES = ('trend', 'pie', 'bar', 'radar', 'forecast')
+FORMATS = ('html', 'png', 'json')
+
+# Set once per worker process by _init_worker
+_cube = None
+_forecaster = None
+
+
+def _init_worker(cube, forecaster):
+    # The dataset is shipped to each worker once, not once per report
+    global _cube, _forecaster
+    _cube = cube
+    _forecaster = forecaster
+
+
+def plan_reports(codes, report_types, baseline=None):
+    # One job per country, plus baseline-vs-country jobs for the comparisons
+    baseline = baseline or codes[0]
+    jobs = []
+    for report in report_types:
+        if report in ('bar', 'radar'):
+            jobs.extend((report, (baseline, code)) for code in codes if code != baseline)
+        else:
+            jobs.extend((report, (code,)) for code in codes)
+    return jobs
+
+
+def build_figure(cube, report, codes, forecaster=None):
+    # (figure, None), or (None, reason) when the report cannot be drawn
+    from render_cache import render_figure
+
+    if report not in REPORT_TYPES:
+        raise ValueError(f"Unknown report type: {report}")
+    args = list(codes) + ([forecaster] if report == 'forecast' else [])
+    # The plotting functions report problems with print(); keep workers
+    # quiet and keep the last message as the reason
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        fig = render_figure(report, cube, *args)
+    if fig is not None:
+        return fig, None
+    messages = output.getvalue().strip().splitlines()
+    return None, messages[-1].strip() if messages else f"No data available for {', '.join(codes)}."
+
+
+def png_export_error():
+    # Why PNG export would fail here (kaleido, or the browser it drives,
+    # is missing), or None when it works
+    import plotly.graph_objects as go
+
+    try:
+        go.Figure().to_image(format='png')
+    except Exception as e:
+        return ' '.join(str(e).split()) or type(e).__name__
+    return None
+
+
+def write_figure(fig, path_base, formats):
+    paths = []
+    for fmt in formats:
+        path = f"{path_base}.{fmt}"
+        if fmt == 'html':
+            fig.write_html(path, include_plotlyjs='cdn')
+        elif fmt == 'png':
+            fig.write_image(path)
+        elif fmt == 'json':
+            fig.write_json(path)
+        else:
+            raise ValueError(f"Unknown output format: {fmt}")
+        paths.append(path)
+    return paths
+
+
+def _render_job(report, codes, output_dir, formats):
+    start = time.perf_counter()
+    fig, reason = build_figure(_cube, report, codes, _forecaster)
+    built = time.perf_counter()
+    if fig is None:
+        return {'report': report, 'codes': codes, 'error': reason, 'render': built - start, 'write': 0.0}
+    # Formats are written one at a time, so the files written before a
+    # failure are still counted
+    path_base = os.path.join(output_dir, f"{report}_{'_'.join(codes)}")
+    result = {'report': report, 'codes': codes, 'paths': [], 'render': built - start}
+    errors = []
+    for fmt in formats:
+        try:
+            result['paths'] += write_figure(fig, path_base, [fmt])
+        except Exception as e:
+            errors.append(f"{fmt}: {str(e).strip()}")
+    if errors:
+        result['error'] = '; '.join(errors)
+    result['write'] = time.perf_counter() - built
+    return result
+
+
+def run_batch(filepath, codes=None, report_types=REPORT_TYPES, formats=('html',), output_dir='reports',
+              max_workers=None, mode='athlete', forecaster='polynomial', baseline=None):
+    from forecasters import get_forecaster
+    from historical_data import load_historical_data
+    from medal_cube import as_medal_cube
+
+    timings = {}
+    start = time.perf_counter()
+    historical_df = load_historical_data(filepath, mode=mode)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cube = as_medal_cube(historical_df)
+    timings['aggregate'] = time.perf_counter() - start
+
+    formats = list(formats)
+    if 'png' in formats:
+        error = png_export_error()
+        if error:
+            formats.remove('png')
+            print(f"Skipping png output: {error}")
+    if not formats:
+        print("No output format available.")
+        return []
+
+    if codes:
+        codes, unknown = cube.resolve(codes)
+        if unknown:
+            print(f"Skipping unknown NOC codes: {', '.join(unknown)}")
+    else:
+        codes = list(cube.nocs)
+    if not codes:
+        print("No known NOC codes to report on.")
+        return []
+    if baseline and not cube.has_country(baseline):
+        print(f"Skipping bar and radar reports: unknown baseline {baseline}")
+        report_types = [r for r in report_types if r not in ('bar', 'radar')]
+    jobs = plan_reports(codes, report_types, baseline)
+    os.makedirs(output_dir, exist_ok=True)
+    forecaster = get_forecaster(forecaster)
+
+    start = time.perf_counter()
+    results = []
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cube, forecaster)) as pool:
+        futures = {
+            pool.submit(_render_job, report, job_codes, output_dir, formats): (report, job_codes)
+            for report, job_codes in jobs
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            report, job_codes = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'report': report, 'codes': job_codes, 'error': str(e).strip(), 'render': 0.0, 'write': 0.0}
+            results.append(result)
+            if 'error' in result:
+                print(f"[{i}/{len(jobs)}] {report} {' '.join(job_codes)}: {result['error']}")
+    timings['render (wall)'] = time.perf_counter() - start
+    timings['render (cpu, summed)'] = sum(r['render'] for r in results)
+    timings['write (cpu, summed)'] = sum(r['write'] for r in results)
+
+    written = sum(len(r.get('paths', ())) for r in results)
+    print(f"\nWrote {written} files for {len(jobs)} reports to {output_dir} using {workers} workers.")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<22} {seconds:8.2f} s")
+    return results
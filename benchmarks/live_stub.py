@@ -0,0 +1,140 @@
+# benchmarks/live_stub.py
+#
+# Checks the response cache in live_client.py against a stub of the live
+# API served from a thread on localhost: fresh hits within the TTL, a
+# conditional request answered with 304 once the TTL has passed, a changed
+# body after a new ETag, and stale entries served while the upstream fails
+# until max_stale runs out. Run from the repository root:
+#
+#     python benchmarks/live_stub.py
+#
+# Exits non-zero when any check fails.
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TTL = 0.2
+MAX_STALE = 0.6
+
+
+class Stub:
+    # What the stub serves next, and the requests it has seen
+    def __init__(self):
+        self.version = 1
+        self.failing = False
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def etag(self):
+        return f'"v{self.version}"'
+
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with stub.lock:
+                stub.requests.append((self.path, self.headers.get('If-None-Match')))
+                failing, etag, version = stub.failing, stub.etag(), stub.version
+            if failing:
+                self.send_response(500)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            body = json.dumps({'data': [{'name': 'Stub', 'version': version}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def main():
+    import requests
+    from live_client import LiveDataClient
+
+    stub = Stub()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = LiveDataClient(f"http://127.0.0.1:{server.server_port}/api", ttl=TTL, max_stale=MAX_STALE)
+    failures = []
+
+    def check(name, ok):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+
+    def version(data):
+        return data['data'][0]['version']
+
+    def seen():
+        with stub.lock:
+            return list(stub.requests)
+
+    try:
+        check("first request goes upstream", version(client.get_json('/countries')) == 1 and len(seen()) == 1)
+        check("fresh entry is served from memory", version(client.get_json('/countries')) == 1 and len(seen()) == 1)
+
+        time.sleep(TTL * 1.5)
+        check("expired entry is served stale", version(client.get_json('/countries')) == 1)
+        check("stale hit revalidates with If-None-Match",
+              wait_for(lambda: len(seen()) == 2) and seen()[-1] == ('/api/countries', '"v1"'))
+        wait_for(lambda: not client._refreshing)
+        check("304 renews the entry", version(client.get_json('/countries')) == 1 and len(seen()) == 2)
+
+        stub.version = 2
+        check("fresh=True fetches the changed body", version(client.get_json('/countries', fresh=True)) == 2)
+
+        stub.failing = True
+        time.sleep(TTL * 1.5)
+        check("stale entry is served while upstream fails", version(client.get_json('/countries')) == 2)
+        wait_for(lambda: len(seen()) == 4 and not client._refreshing)
+        check("failed refresh keeps the stale entry", version(client.get_json('/countries')) == 2)
+
+        time.sleep(TTL + MAX_STALE)
+        try:
+            client.get_json('/countries')
+            check("error surfaces once max_stale has passed", False)
+        except requests.exceptions.RequestException:
+            check("error surfaces once max_stale has passed", True)
+
+        stub.failing = False
+        check("recovers when upstream does", version(client.get_json('/countries')) == 2)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("All checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/memory.py
+#
+# Memory held for the athlete data before and after the compact shared
+# representation. Run from the repository root:
+#
+#     python benchmarks/memory.py [--data athlete_events.csv] [--sessions N]
+#
+# Without --data a synthetic file the size of the real one is generated.
+#
+# "before" is the full CSV as parsed by pandas, handed to every session as
+# a pickled copy (st.cache_data) plus the session_state reference the
+# dashboard used to keep. "after" is the projected, categorical table that
+# every session shares through st.cache_resource.
+
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MB = 1024 * 1024
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def load(variant, path):
+    import pandas as pd
+    from data_cache import read_athlete_table, VIEW_COLUMNS
+
+    if variant == 'before':
+        return pd.read_csv(path)
+    return read_athlete_table(path, columns=VIEW_COLUMNS)
+
+
+def measure(variant, path):
+    # Peak resident memory added by loading, measured in a fresh process so
+    # allocations made outside Python (pyarrow) are included
+    import pandas  # noqa: F401 (imported before the baseline is taken)
+    import data_cache  # noqa: F401
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = load(variant, path)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(json.dumps({'seconds': seconds, 'peak': peak * 1024}))
+
+
+def run_child(variant, path):
+    out = subprocess.run([sys.executable, __file__, '--data', path, '--child', variant],
+                         check=True, capture_output=True, text=True, env=os.environ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Athlete data memory benchmark")
+    parser.add_argument('--data', help="athlete_events CSV (default: synthetic, 1x)")
+    parser.add_argument('--sessions', type=int, default=10, help="concurrent dashboard sessions to model")
+    parser.add_argument('--child', choices=['before', 'after'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Keep the benchmark's parquet cache away from the real one
+    os.environ.setdefault('OLYMPIC_CACHE_DIR', tempfile.mkdtemp(prefix='olympic-bench-'))
+    if args.child:
+        measure(args.child, args.data)
+        return
+    if args.data is None:
+        # Generated in its own process so it does not raise this one's peak
+        args.data = os.path.join(os.environ['OLYMPIC_CACHE_DIR'], 'athlete_events.csv')
+        subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'synthetic.py'), args.data], check=True)
+
+    # Children run before this process loads anything: Linux carries the
+    # peak resident size of a parent over into the programs it starts.
+    # The first run only builds the parquet cache.
+    run_child('after', args.data)
+    before_run, after_run = run_child('before', args.data), run_child('after', args.data)
+
+    from historical_data import medal_rows
+
+    before, after = load('before', args.data), load('after', args.data)
+    before_bytes, after_bytes = frame_bytes(before), frame_bytes(after)
+    session_copy = frame_bytes(pickle.loads(pickle.dumps(before)))
+    medals = medal_rows(after)
+
+    rows = [
+        ("rows", f"{len(before):,}", f"{len(after):,}"),
+        ("columns", len(before.columns), len(after.columns)),
+        ("load time (s)", f"{before_run['seconds']:.2f}", f"{after_run['seconds']:.2f}"),
+        ("peak RSS growth (MB)", f"{before_run['peak'] / MB:.1f}", f"{after_run['peak'] / MB:.1f}"),
+        ("table (MB)", f"{before_bytes / MB:.1f}", f"{after_bytes / MB:.1f}"),
+        ("per extra session (MB)", f"{session_copy / MB:.1f}", "0.0"),
+        (f"{args.sessions} sessions (MB)", f"{(before_bytes + args.sessions * session_copy) / MB:.1f}",
+         f"{after_bytes / MB:.1f}"),
+        ("medal rows (MB)", "-", f"{frame_bytes(medals) / MB:.1f}"),
+    ]
+    print(f"{'':<26}{'before':>12}{'after':>12}")
+    for label, old, new in rows:
+        print(f"{label:<26}{old:>12}{new:>12}")
+
+    print("\nPer-column bytes after:")
+    for col, size in after.memory_usage(deep=True, index=False).items():
+        print(f"  {col:<10}{str(after[col].dtype):<12}{size / MB:8.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
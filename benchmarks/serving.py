@@ -0,0 +1,215 @@
+# benchmarks/serving.py
+#
+# Load test for the serving mode in data_plane.py. Starts 1, 2, 4, ...
+# dashboard-like worker processes, each serving a number of simulated
+# sessions (medal cube views and athlete index queries), first with every
+# worker building its own data and then with every worker attached to one
+# published data plane. Memory is the proportional set size (PSS) of the
+# workers, so pages shared between them are counted once in the total.
+# Halfway through the shared run a new version is published and every
+# worker must swap to it. Workers run concurrently, so latencies include
+# contention for the machine's cores. Linux only. Run from the repository root:
+#
+#     python benchmarks/serving.py [--data athlete_events.csv] [--workers 1 2 4 8] [--sessions 200]
+#
+# Without --data a synthetic file the size of the real one is generated.
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MB = 1024 * 1024
+
+
+def smaps(pid):
+    # {'Pss': bytes, 'Private_Dirty': bytes, ...} for a running process
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return values
+
+
+class Standalone:
+    # What each dashboard process did before serving mode: its own copy
+    def __init__(self, data):
+        from athlete_index import AthleteIndex, INDEX_COLUMNS
+        from data_cache import read_athlete_table, VIEW_COLUMNS
+        from historical_data import pivot_medal_table
+        from medal_cube import MedalCube
+
+        df = read_athlete_table(data, columns=list(dict.fromkeys(VIEW_COLUMNS + INDEX_COLUMNS)))
+        self.cubes = {mode: MedalCube.from_frame(pivot_medal_table(df, mode)) for mode in ('athlete', 'nation')}
+        self.index = AthleteIndex.from_frame(df)
+        self.version = None
+
+    def cube(self, mode):
+        return self.cubes[mode]
+
+    def athlete_index(self):
+        return self.index
+
+
+def session(plane, rng):
+    # One page view, picked the way a visitor might
+    cube = plane.cube(rng.choice(['athlete', 'nation']))
+    index = plane.athlete_index()
+    view = rng.randrange(5)
+    if view == 0:
+        cube.top_n(10)
+    elif view == 1:
+        cube.country_by_year(rng.choice(list(cube.nocs)))
+    elif view == 2:
+        index.top_athletes(10, rng.choice(list(index.sports)))
+    elif view == 3:
+        index.country_strength(rng.choice(list(index.sports)), 'nation')
+    else:
+        sport = rng.choice(list(index.sports))
+        index.event_history(sport, rng.choice(index.events(sport)))
+
+
+def worker(mode, data, plane_dir, sessions, seed):
+    import pandas  # noqa: F401 (the same imports in every mode)
+    import numpy  # noqa: F401
+    import athlete_index  # noqa: F401
+    import data_plane
+
+    rng = random.Random(seed)
+    if mode == 'standalone':
+        local = Standalone(data)
+        current = lambda: local  # noqa: E731
+    elif mode == 'shared':
+        client = data_plane.DataPlaneClient(plane_dir)
+        current = client.current
+    else:
+        current = None
+
+    times, versions = [], set()
+
+    def serve(n):
+        for _ in range(n):
+            start = time.perf_counter()
+            plane = current()
+            session(plane, rng)
+            times.append(time.perf_counter() - start)
+            versions.add(plane.version)
+
+    # Two halves, so the parent can publish a new version in between
+    if current:
+        serve(sessions // 2)
+    print('half', flush=True)
+    sys.stdin.readline()
+    if current:
+        serve(sessions - sessions // 2)
+    times.sort()
+    print(json.dumps({
+        'p50': statistics.median(times) if times else 0,
+        'p95': times[int(len(times) * 0.95)] if times else 0,
+        'versions': sorted(v for v in versions if v is not None),
+    }), flush=True)
+    sys.stdin.readline()
+
+
+def run_workers(mode, count, data, plane_dir, sessions, publish=None):
+    procs = [
+        subprocess.Popen([sys.executable, __file__, '--worker', mode, '--data', data, '--plane', plane_dir,
+                          '--sessions', str(sessions), '--seed', str(i)],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=os.environ)
+        for i in range(count)
+    ]
+    try:
+        for proc in procs:
+            proc.stdout.readline()
+        if publish:
+            publish()
+        for proc in procs:
+            proc.stdin.write('\n')
+            proc.stdin.flush()
+        stats = [json.loads(proc.stdout.readline()) for proc in procs]
+        # Measured while every worker is alive and holding its data
+        memory = [smaps(proc.pid) for proc in procs]
+        for proc in procs:
+            proc.stdin.write('\n')
+            proc.stdin.flush()
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    return stats, memory
+
+
+def publish_plane(data, plane_dir):
+    subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), '--publish', plane_dir, '--data', data],
+                   check=True, capture_output=True, text=True, env=os.environ)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serving mode load test")
+    parser.add_argument('--data', help="athlete_events CSV (default: synthetic, 1x)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--sessions', type=int, default=200, help="simulated page views per worker")
+    parser.add_argument('--plane', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', choices=['idle', 'standalone', 'shared'], help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(args.worker, args.data, args.plane, args.sessions, args.seed)
+        return
+
+    os.environ.setdefault('OLYMPIC_CACHE_DIR', tempfile.mkdtemp(prefix='olympic-bench-'))
+    if args.data is None:
+        args.data = os.path.join(os.environ['OLYMPIC_CACHE_DIR'], 'athlete_events.csv')
+        subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'synthetic.py'), args.data], check=True)
+
+    shm = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    plane_dir = tempfile.mkdtemp(prefix='olympic-plane-', dir=shm)
+    try:
+        publish_plane(args.data, plane_dir)
+        from data_plane import current_version
+
+        plane_bytes = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(plane_dir) for f in files)
+        print(f"Data plane: {plane_bytes / MB:.1f} MB in {plane_dir}")
+
+        # Interpreter and imports alone, which workers partly share with
+        # each other too; subtracted to leave the memory held for data
+        idle = {count: sum(m['Pss'] for m in run_workers('idle', count, args.data, plane_dir, 0)[1])
+                for count in args.workers}
+        print(f"Idle worker (interpreter and imports only): {idle[args.workers[0]] / args.workers[0] / MB:.1f} MB PSS\n")
+
+        print(f"{'mode':<12}{'workers':>8}{'total PSS':>12}{'data PSS':>12}{'private/wkr':>13}"
+              f"{'p50 ms':>9}{'p95 ms':>9}  versions")
+        for mode in ('standalone', 'shared'):
+            for count in args.workers:
+                publish = None
+                if mode == 'shared':
+                    before = current_version(plane_dir)
+                    publish = lambda: publish_plane(args.data, plane_dir)  # noqa: E731
+                stats, memory = run_workers(mode, count, args.data, plane_dir, args.sessions, publish)
+                total = sum(m['Pss'] for m in memory)
+                private = statistics.mean(m.get('Private_Clean', 0) + m.get('Private_Dirty', 0) for m in memory)
+                versions = '-'
+                if mode == 'shared':
+                    swapped = all(s['versions'] == [before, before + 1] for s in stats)
+                    versions = f"{before} -> {before + 1}" + ('' if swapped else ' (not every worker swapped)')
+                print(f"{mode:<12}{count:>8}{total / MB:>10.1f}MB{(total - idle[count]) / MB:>10.1f}MB"
+                      f"{private / MB:>11.1f}MB{max(s['p50'] for s in stats) * 1000:>9.2f}"
+                      f"{max(s['p95'] for s in stats) * 1000:>9.2f}  {versions}")
+    finally:
+        shutil.rmtree(plane_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
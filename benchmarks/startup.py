@@ -0,0 +1,96 @@
+# benchmarks/startup.py
+#
+# Time to first prompt for the CLI and the import cost paid before first
+# paint for the dashboard. Run from the repository root:
+#
+#     python benchmarks/startup.py [--runs N]
+
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MS = 300
+
+DASHBOARD_IMPORTS = """
+import sys, time
+import streamlit  # already loaded by the 'streamlit run' server
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def time_cli_first_prompt():
+    # Wall time from process launch until the menu prompt is printed
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-u', 'main.py'], cwd=ROOT,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    buffer = ''
+    while 'Enter your choice' not in buffer:
+        char = proc.stdout.read(1)
+        if not char:
+            break
+        buffer += char
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.communicate('14\n')
+    return elapsed
+
+
+def time_interpreter():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def dashboard_top_level_imports():
+    # Modules the dashboard script imports before its first st.* call
+    with open(os.path.join(ROOT, 'olaymic_dashboard_app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.append(node.module)
+        elif isinstance(node, ast.Expr):
+            break
+    return [n for n in names if n != 'streamlit']
+
+
+def time_dashboard_imports(modules):
+    out = subprocess.run(
+        [sys.executable, '-c', DASHBOARD_IMPORTS] + modules,
+        cwd=ROOT, check=True, capture_output=True, text=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def report(name, samples):
+    median = statistics.median(samples)
+    status = 'OK' if median < TARGET_MS else 'SLOW'
+    print(f"{name:<32} median {median:8.1f} ms  min {min(samples):8.1f} ms  [{status}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    modules = dashboard_top_level_imports()
+    print(f"Target: {TARGET_MS} ms")
+    print(f"Dashboard imports before first paint: {', '.join(modules) or '(none)'}")
+    report('python -c pass (baseline)', [time_interpreter() for _ in range(args.runs)])
+    report('CLI first prompt', [time_cli_first_prompt() for _ in range(args.runs)])
+    report('Dashboard first paint imports', [time_dashboard_imports(modules) for _ in range(args.runs)])
+
+
+if __name__ == '__main__':
+    main()
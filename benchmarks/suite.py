@@ -0,0 +1,227 @@
+# benchmarks/suite.py
+#
+# Times the load, aggregate, forecast and render hot paths on synthetic
+# athlete_events data at several scales and writes the results as JSON.
+# Runs offline. From the repository root:
+#
+#     python benchmarks/suite.py [--scales 1 10 100] [--repeats N]
+#     python benchmarks/suite.py --compare benchmarks/results/old.json
+#
+# Each stage is timed over several runs (median and best are reported)
+# and once more under tracemalloc for its peak allocation. Allocations
+# made by pyarrow outside Python are not traced; the process peak RSS is
+# recorded per scale for those.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+COMPARE_COUNTRIES = 20
+REGRESSION = 1.10
+
+MB = 1024 * 1024
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset(scale, data_dir):
+    # Generated once per scale and reused by later runs
+    from synthetic import write_athlete_events
+
+    path = os.path.join(data_dir, f"athlete_events_{scale:g}x.csv")
+    if not os.path.exists(path):
+        print(f"Generating {scale:g}x dataset in {path} ...")
+        write_athlete_events(path, scale)
+    return path
+
+
+def stages(path, forecaster):
+    # (name, setup, run): setup is untimed and its result is passed to run
+    from athlete_index import AthleteIndex, INDEX_COLUMNS
+    from data_cache import _cache_paths, read_athlete_table, VIEW_COLUMNS
+    from forecast_cache import forecast_cache
+    from historical_data import load_historical_data, get_country_medal_counts, pivot_medal_table
+    from medal_cube import MedalCube
+    from prediction import predict_future_medals
+    from ranking import Rankings
+    import numpy as np
+    import visualization
+
+    def drop_cache():
+        for cache_path in _cache_paths(path):
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+
+    load_historical_data(path)
+    raw = read_athlete_table(path, columns=VIEW_COLUMNS)
+    historical_df = load_historical_data(path)
+    cube = MedalCube.from_frame(historical_df)
+    leader = cube.nocs[cube.ranking[0]]
+    leaders = list(cube.nocs[cube.ranking[:COMPARE_COUNTRIES]])
+    athletes = read_athlete_table(path, columns=INDEX_COLUMNS)
+    index = AthleteIndex.from_frame(athletes)
+    sport = index.sports[np.argmax(np.diff(index.sport_rows))]
+    event = index.events(sport)[0]
+    rankings = Rankings.from_cube(cube)
+
+    def fresh_cube():
+        return MedalCube.from_frame(historical_df)
+
+    def cold_forecast():
+        forecast_cache.clear()
+        return get_country_medal_counts(cube, leader)
+
+    return [
+        ('load_historical_data (csv)', drop_cache, lambda _: load_historical_data(path)),
+        ('load_historical_data (parquet)', None, lambda _: load_historical_data(path)),
+        ('dashboard pivot (athlete)', None, lambda _: pivot_medal_table(raw, 'athlete')),
+        ('dashboard pivot (nation)', None, lambda _: pivot_medal_table(raw, 'nation')),
+        ('medal cube build', None, lambda _: MedalCube.from_frame(historical_df)),
+        ('get_country_medal_counts', fresh_cube, lambda c: get_country_medal_counts(c, leader)),
+        ('plot_interactive_medals', None, lambda _: visualization.plot_interactive_medals(cube)),
+        ('plot_country_medal_trend', fresh_cube,
+         lambda c: visualization.plot_country_medal_trend(get_country_medal_counts(c, leader), leader)),
+        ('plot_country_pie', None, lambda _: visualization.plot_country_pie(cube, leader)),
+        (f'compare_countries ({COMPARE_COUNTRIES})', None, lambda _: visualization.compare_countries(cube, leaders)),
+        (f'radar_compare_multiple ({COMPARE_COUNTRIES})', None,
+         lambda _: visualization.radar_compare_multiple(cube, leaders)),
+        (f'plot_countries_by_year ({COMPARE_COUNTRIES})', None,
+         lambda _: visualization.plot_countries_by_year(cube, leaders)),
+        ('athlete index build', None, lambda _: AthleteIndex.from_frame(athletes)),
+        ('top_athletes (all)', None, lambda _: index.top_athletes(10)),
+        ('top_athletes (largest sport)', None, lambda _: index.top_athletes(10, sport)),
+        ('country_strength (largest sport)', None, lambda _: index.country_strength(sport, 'nation')),
+        ('event_history', None, lambda _: index.event_history(sport, event)),
+        ('rankings build (every Games)', None, lambda _: Rankings.from_cube(cube)),
+        ('rankings build (every sport)', None, lambda _: Rankings.from_index(index, 'nation')),
+        ('ranking table (all-time)', None, lambda _: rankings.table(rankings.groups[0], 'points', n=10)),
+        (f'predict_future_medals ({forecaster})', cold_forecast,
+         lambda counts: predict_future_medals(counts, leader, forecaster)),
+    ]
+
+
+def run_stage(setup, run, repeats):
+    times = []
+    for _ in range(repeats):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    run(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds_median': statistics.median(times),
+        'seconds_min': min(times),
+        'repeats': repeats,
+        'peak_bytes': peak,
+    }
+
+
+def run_suite(scales, repeats, forecaster, data_dir):
+    results = []
+    for scale in scales:
+        path = dataset(scale, data_dir)
+        with open(path) as f:
+            rows = sum(1 for _ in f) - 1
+        print(f"\n{scale:g}x ({rows:,} rows)")
+        for name, setup, run in stages(path, forecaster):
+            # Plot and forecast functions report with print(); keep output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_stage(setup, run, repeats)
+            result.update(scale=scale, rows=rows, stage=name)
+            results.append(result)
+            print(f"  {name:<40}{result['seconds_median'] * 1000:10.1f} ms{result['peak_bytes'] / MB:10.1f} MB")
+        results.append({'scale': scale, 'rows': rows, 'stage': 'process peak RSS',
+                         'peak_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024})
+    return results
+
+
+def compare(old_path, results):
+    with open(old_path) as f:
+        old = {(r['scale'], r['stage']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {old_path} (slower than {REGRESSION:.0%} of the old median is flagged):")
+    for result in results:
+        before = old.get((result['scale'], result['stage']))
+        if before is None or 'seconds_median' not in result or not before.get('seconds_median'):
+            continue
+        ratio = result['seconds_median'] / before['seconds_median']
+        flag = '  <-- slower' if ratio > REGRESSION else ''
+        print(f"  {result['scale']:>5g}x {result['stage']:<40}{ratio:8.2f}x{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hot path benchmark suite')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--forecaster', default='wls', help="model used for predict_future_medals")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'olympic-bench-data'),
+                        help="where generated datasets are kept between runs")
+    parser.add_argument('--output', help="JSON file to write (default: benchmarks/results/<revision>-<time>.json)")
+    parser.add_argument('--compare', help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    # Benchmark caches must not touch, or be warmed by, the real ones
+    os.environ['OLYMPIC_CACHE_DIR'] = tempfile.mkdtemp(prefix='olympic-bench-cache-')
+    os.makedirs(args.data_dir, exist_ok=True)
+    sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+    import numpy
+    import pandas
+    import plotly
+
+    revision = _git_revision()
+    results = run_suite(args.scales, args.repeats, args.forecaster, args.data_dir)
+    report = {
+        'meta': {
+            'revision': revision,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'numpy': numpy.__version__,
+            'pandas': pandas.__version__,
+            'plotly': plotly.__version__,
+            'repeats': args.repeats,
+            'forecaster': args.forecaster,
+        },
+        'results': results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{revision or 'local'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# benchmarks/synthetic.py
+#
+# Synthetic athlete_events data with the schema, Games calendar and rough
+# shape of the real Kaggle file, for benchmarking without the download.
+# Scale 1 is the size of the real file; larger scales are written in
+# chunks so memory stays flat. Run from the repository root:
+#
+#     python benchmarks/synthetic.py athlete_events_10x.csv --scale 10
+
+import argparse
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_ROWS = 271116
+MEDAL_RATE = 0.147
+
+SUMMER_YEARS = [y for y in range(1896, 2017, 4) if y not in (1916, 1940, 1944)]
+WINTER_YEARS = [y for y in range(1924, 1993, 4) if y not in (1940, 1944)] + list(range(1994, 2015, 4))
+
+SPORTS = {
+    # sport: (events, team event)
+    'Athletics': (47, False), 'Swimming': (34, False), 'Gymnastics': (18, False),
+    'Cycling': (18, False), 'Fencing': (12, False), 'Shooting': (15, False),
+    'Rowing': (14, True), 'Football': (2, True), 'Hockey': (2, True),
+    'Basketball': (2, True), 'Alpine Skiing': (10, False), 'Ice Hockey': (2, True),
+}
+WINTER_SPORTS = {'Alpine Skiing', 'Ice Hockey'}
+
+
+def _nocs():
+    regions = pd.read_csv(os.path.join(ROOT, 'data', 'noc_regions.csv'), lineterminator='\r')
+    return regions['NOC'].dropna().str.strip().tolist()
+
+
+def _games():
+    games = [(y, 'Summer') for y in SUMMER_YEARS] + [(y, 'Winter') for y in WINTER_YEARS]
+    # Later Games have many more entrants
+    weights = np.array([(y - 1880) ** 2 * (1.0 if s == 'Summer' else 0.25) for y, s in games])
+    return games, weights / weights.sum()
+
+
+def generate_athlete_events(rows=BASE_ROWS, seed=0, id_offset=0):
+    rng = np.random.default_rng(seed)
+    nocs = np.array(_nocs())
+    # A few countries win most of the medals
+    noc_weights = 1.0 / np.arange(1, len(nocs) + 1) ** 1.1
+    noc_order = np.random.default_rng(0).permutation(len(nocs))
+    noc_p = noc_weights[np.argsort(noc_order)] / noc_weights.sum()
+
+    games, games_p = _games()
+    g = rng.choice(len(games), rows, p=games_p)
+    year = np.array([y for y, _ in games])[g]
+    season = np.array([s for _, s in games])[g]
+
+    summer = [s for s in SPORTS if s not in WINTER_SPORTS]
+    sport = np.where(
+        season == 'Summer',
+        rng.choice(summer, rows),
+        rng.choice(sorted(WINTER_SPORTS), rows)
+    )
+    n_events = np.array([SPORTS[s][0] for s in sport])
+    event = pd.Series(sport) + ' Event ' + pd.Series(rng.integers(0, 1 << 30, rows) % n_events).astype(str)
+
+    noc = rng.choice(nocs, rows, p=noc_p)
+    medal = np.full(rows, None, dtype=object)
+    won = rng.random(rows) < MEDAL_RATE
+    medal[won] = rng.choice(['Gold', 'Silver', 'Bronze'], int(won.sum()))
+
+    df = pd.DataFrame({
+        'ID': id_offset + rng.integers(1, max(rows // 2, 2), rows),
+        'Sex': rng.choice(['M', 'F'], rows, p=[0.72, 0.28]),
+        'Age': rng.integers(14, 45, rows).astype(float),
+        'Height': np.round(rng.normal(176, 10, rows)),
+        'Weight': np.round(rng.normal(71, 14, rows)),
+        'NOC': noc,
+        'Year': year,
+        'Season': season,
+        'Sport': sport,
+        'Event': event.to_numpy(),
+        'Medal': medal,
+    })
+
+    # Team sports: every medalled athlete in the same Games, event and medal
+    # belongs to one nation, so team medals repeat across athlete rows
+    team = df['Sport'].map(lambda s: SPORTS[s][1]).to_numpy() & won
+    if team.any():
+        group = df.loc[team].groupby(['Year', 'Season', 'Event', 'Medal'], sort=False)['NOC']
+        df.loc[team, 'NOC'] = group.transform('first')
+
+    for col in ('Age', 'Height', 'Weight'):
+        df.loc[rng.random(rows) < 0.1, col] = np.nan
+    df.insert(1, 'Name', 'Athlete ' + df['ID'].astype(str))
+    df.insert(6, 'Team', df['NOC'])
+    df.insert(8, 'Games', df['Year'].astype(str) + ' ' + df['Season'])
+    df.insert(11, 'City', 'City ' + df['Year'].astype(str))
+    return df
+
+
+def write_athlete_events(path, scale=1, seed=0):
+    # Writes scale x BASE_ROWS rows in chunks of BASE_ROWS
+    chunks = max(int(round(scale)), 1)
+    rows = int(BASE_ROWS * scale / chunks)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='') as f:
+        for i in range(chunks):
+            df = generate_athlete_events(rows, seed=seed + i, id_offset=i * rows)
+            df.to_csv(f, index=False, header=(i == 0), quoting=csv.QUOTE_MINIMAL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Synthetic athlete_events generator')
+    parser.add_argument('path', help="CSV file to write")
+    parser.add_argument('--scale', type=float, default=1, help="multiple of the real file's 271,116 rows")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_athlete_events(args.path, args.scale, args.seed)
+    print(f"Wrote {int(BASE_ROWS * args.scale):,} rows to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
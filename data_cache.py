@@ -0,0 +1,499 @@
+# data_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+import tracing
+
+CACHE_DIR = os.environ.get(
+    'OLYMPIC_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache')
+)
+
+# Low-cardinality string columns stored as categoricals in the cache
+CATEGORICAL_COLUMNS = ['Sex', 'Team', 'NOC', 'Games', 'Season', 'City', 'Sport', 'Event', 'Medal']
+MEDAL_CATEGORIES = ['Gold', 'Silver', 'Bronze']
+
+# Narrowest types that hold the numeric columns; integers are only
+# narrowed when the column has no missing values
+NUMERIC_DTYPES = {'ID': 'int32', 'Year': 'int16', 'Age': 'float32', 'Height': 'float32', 'Weight': 'float32'}
+
+# Columns read by the CLI and dashboard views
+VIEW_COLUMNS = ['NOC', 'Games', 'Year', 'Season', 'Sport', 'Event', 'Medal']
+
+# Columns that identify one athlete result, most specific first
+KEY_COLUMNS = [['ID', 'Games', 'Event'], ['Name', 'NOC', 'Games', 'Event']]
+
+# Rows parsed at a time when streaming a CSV
+CHUNK_ROWS = 250_000
+
+# Seconds a remote source without validators is served from the cache
+# before it is downloaded again and its content compared
+REMOTE_TTL = 6 * 60 * 60
+
+
+def _is_url(source):
+    return str(source).startswith(('http://', 'https://'))
+
+
+def _cache_base(source):
+    name = hashlib.sha1(str(source).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, name)
+
+
+def _cache_paths(source):
+    base = _cache_base(source)
+    return base + '.parquet', base + '.json'
+
+
+def _ingest_paths(source):
+    # Rows ingested on top of the source, kept so they survive a rebuild
+    base = _cache_base(source)
+    return base + '.deltas.parquet', base + '.tallies.parquet'
+
+
+def source_fingerprint(source):
+    # Checksum for local files, validator headers for remote ones.
+    # Returns None when the source cannot be reached or sends no
+    # validators; a downloaded source is then keyed by its content.
+    if _is_url(source):
+        try:
+            response = requests.head(source, allow_redirects=True, timeout=10)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            return None
+        headers = response.headers
+        etag = headers.get('ETag')
+        if etag:
+            return f"etag:{etag}"
+        modified = headers.get('Last-Modified')
+        if modified:
+            return f"modified:{modified}:{headers.get('Content-Length', '')}"
+        return None
+
+    digest = hashlib.sha1()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f"sha1:{digest.hexdigest()}"
+
+
+def _download(source):
+    # A remote CSV spooled to a temporary file, with the checksum of its
+    # content as a fingerprint
+    handle = tempfile.TemporaryFile()
+    digest = hashlib.sha1()
+    try:
+        with requests.get(source, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            for block in response.iter_content(1 << 20):
+                digest.update(block)
+                handle.write(block)
+    except BaseException:
+        handle.close()
+        raise
+    handle.seek(0)
+    return handle, f"sha1:{digest.hexdigest()}"
+
+
+def _cache_writable():
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(CACHE_DIR, os.W_OK)
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def to_categoricals(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        if col == 'Medal':
+            df[col] = pd.Categorical(df[col], categories=MEDAL_CATEGORIES)
+        elif df[col].isna().all():
+            # Keeps string categories for a column a chunk leaves empty
+            df[col] = pd.Categorical(df[col], categories=pd.Index([], dtype=object))
+        else:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def compact_frame(df):
+    # Categorical codes for the string columns and narrow numeric types
+    df = to_categoricals(df)
+    for col, dtype in NUMERIC_DTYPES.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if dtype.startswith('int') and df[col].isna().any():
+            continue
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def _write_parquet(df, path):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _read_parquet(path):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def _write_meta(meta_path, source, key, columns):
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'source': str(source), 'key': key, 'columns': list(columns), 'checked_at': time.time()}, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _write_cache(df, parquet_path, meta_path, source, key):
+    _write_parquet(df, parquet_path)
+    _write_meta(meta_path, source, key, df.columns)
+
+
+def _arrow_schema(chunk):
+    # One schema for every chunk of a streamed cache, whatever categories
+    # or missing values a chunk happens to hold
+    import pyarrow as pa
+
+    fields = []
+    for col in chunk.columns:
+        if col in CATEGORICAL_COLUMNS:
+            dtype = pa.dictionary(pa.int32(), pa.string())
+        elif col in NUMERIC_DTYPES:
+            dtype = pa.from_numpy_dtype(np.dtype(NUMERIC_DTYPES[col]))
+        elif chunk[col].dtype == object:
+            dtype = pa.string()
+        else:
+            dtype = pa.from_numpy_dtype(chunk[col].dtype)
+        fields.append(pa.field(col, dtype))
+    return pa.schema(fields)
+
+
+class _CacheWriter:
+    # Parquet cache written one chunk at a time. It replaces the previous
+    # cache only once every chunk is written; a failed write is reported
+    # and the rows are still served.
+
+    def __init__(self, source, key):
+        self.source = source
+        self.key = key
+        self.parquet_path, self.meta_path = _cache_paths(source)
+        self.schema = None
+        self._writer = None
+        self._failed = key is None or not _cache_writable()
+
+    @property
+    def enabled(self):
+        return not self._failed
+
+    def write(self, chunk):
+        if self._failed:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            if self._writer is None:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                self.schema = _arrow_schema(chunk)
+                self._writer = pq.ParquetWriter(self.parquet_path + '.tmp', self.schema)
+            self._writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+        except Exception as e:
+            print(f"Could not write data cache: {e}")
+            self.abort()
+            self._failed = True
+
+    def finish(self):
+        if self._writer is None:
+            return
+        try:
+            self._writer.close()
+            self._writer = None
+            os.replace(self.parquet_path + '.tmp', self.parquet_path)
+            _write_meta(self.meta_path, self.source, self.key, self.schema.names)
+        except Exception as e:
+            print(f"Could not write data cache: {e}")
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self.parquet_path + '.tmp')
+
+
+def _cache_state(source):
+    # (key, meta, fresh, download) for the parquet cache of a source;
+    # download is the (file, key) of a source fetched to check it
+    parquet_path, meta_path = _cache_paths(source)
+    meta = _read_meta(meta_path)
+    key = source_fingerprint(source)
+    cached = meta is not None and os.path.exists(parquet_path)
+    if key is not None or not _is_url(source) or not cached:
+        return key, meta, cached and meta.get('key') == key, None
+
+    # A remote source without validators is trusted for REMOTE_TTL after it
+    # was last checked, then downloaded and compared by content. While it
+    # cannot be reached the last good cache is served.
+    if time.time() - meta.get('checked_at', 0) < REMOTE_TTL:
+        return meta.get('key'), meta, True, None
+    try:
+        download = _download(source)
+    except requests.exceptions.RequestException as e:
+        print(f"Could not check {source}, using the cached copy: {e}")
+        return meta.get('key'), meta, True, None
+    if download[1] != meta.get('key'):
+        return download[1], meta, False, download
+    download[0].close()
+    try:
+        _write_meta(meta_path, source, meta['key'], meta.get('columns', []))
+    except OSError:
+        pass
+    return meta['key'], meta, True, None
+
+
+def _csv_chunks(source, key, chunksize, progress=None, columns=None, download=None):
+    # Parses the CSV chunk by chunk, rebuilding the cache as it goes and
+    # replaying rows ingested since. Yields every column while the cache
+    # is being written, and only the given columns when it cannot be.
+    # Chunks carry the source key in attrs.
+    deltas = _read_parquet(_ingest_paths(source)[0])
+    if _is_url(source):
+        handle, content_key = download or _download(source)
+        key = key or content_key
+    else:
+        handle = open(source, 'rb')
+    size = os.fstat(handle.fileno()).st_size
+    writer = _CacheWriter(source, key)
+    usecols = None
+    if columns is not None and not writer.enabled:
+        usecols = set(columns).__contains__
+    rows, chunk, complete = 0, None, False
+    try:
+        with pd.read_csv(handle, dtype={c: 'category' for c in CATEGORICAL_COLUMNS}, usecols=usecols,
+                         chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk = compact_frame(chunk)
+                if deltas is not None and not deltas.empty:
+                    deltas = unmatched_rows(chunk, deltas)
+                writer.write(chunk)
+                rows += len(chunk)
+                chunk.attrs['source_key'] = key
+                yield chunk
+                if progress:
+                    progress(rows, min(handle.tell() / size, 1.0) if size else None)
+        if deltas is not None and not deltas.empty:
+            chunk = compact_frame(_align_rows(chunk, deltas) if chunk is not None else deltas)
+            writer.write(chunk)
+            chunk.attrs['source_key'] = key
+            yield chunk
+        complete = True
+    finally:
+        handle.close()
+        if complete:
+            writer.finish()
+        else:
+            writer.abort()
+
+
+def _parquet_chunks(parquet, columns, chunksize, progress=None):
+    if columns is not None:
+        columns = [c for c in columns if c in parquet.schema_arrow.names]
+    total, rows = parquet.metadata.num_rows, 0
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        chunk = compact_frame(batch.to_pandas())
+        rows += len(chunk)
+        yield chunk
+        if progress:
+            progress(rows, rows / total if total else None)
+
+
+def iter_athlete_table(source, columns=None, chunksize=CHUNK_ROWS, progress=None):
+    # The athlete table in chunks of at most chunksize rows, so memory is
+    # bounded by the chunk size rather than the file. Served from the
+    # parquet cache when it is fresh; otherwise the CSV is parsed chunk by
+    # chunk and the cache rebuilt on the way. progress(rows, fraction) is
+    # called after each chunk, with fraction None when the size is unknown.
+    key, meta, fresh, download = _cache_state(source)
+    done = 0
+    if fresh:
+        import pyarrow.parquet as pq
+
+        parquet_path = _cache_paths(source)[0]
+        try:
+            # A chunk can fail to decode part way through; the CSV then
+            # picks up after the rows already served, which the cache
+            # holds in the same order
+            for chunk in _parquet_chunks(pq.ParquetFile(parquet_path), columns, chunksize, progress):
+                if not done:
+                    tracing.count('data_cache.hit')
+                done += len(chunk)
+                chunk.attrs['source_key'] = meta['key']
+                yield chunk
+            return
+        except Exception as e:
+            print(f"Ignoring unreadable cache {parquet_path}: {e}")
+
+    tracing.count('data_cache.miss')
+    skip = done
+    for chunk in _csv_chunks(source, key, chunksize, progress, columns, download):
+        if skip:
+            chunk, skip = chunk.iloc[skip:], max(skip - len(chunk), 0)
+            if chunk.empty:
+                continue
+        chunk_key = chunk.attrs.get('source_key')
+        if columns is not None:
+            chunk = chunk[[c for c in columns if c in chunk.columns]]
+        chunk.attrs['source_key'] = chunk_key
+        yield chunk
+
+
+def concat_frames(frames):
+    # Concatenates chunks whose categoricals hold different categories
+    # without widening them to object columns
+    from pandas.api.types import union_categoricals
+
+    if len(frames) == 1:
+        return frames[0]
+    data = {}
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            data[col] = union_categoricals([f[col] for f in frames])
+        else:
+            data[col] = np.concatenate([f[col].to_numpy() for f in frames])
+    return compact_frame(pd.DataFrame(data))
+
+
+def read_athlete_table(source, columns=None):
+    parquet_path, meta_path = _cache_paths(source)
+    key, meta, fresh, download = _cache_state(source)
+    if fresh:
+        try:
+            with tracing.span('load.parquet'):
+                df = compact_frame(pd.read_parquet(parquet_path, columns=columns))
+            df.attrs['source_key'] = meta['key']
+            tracing.count('data_cache.hit')
+            return df
+        except Exception as e:
+            print(f"Ignoring unreadable cache {parquet_path}: {e}")
+    tracing.count('data_cache.miss')
+
+    # Stale or missing cache: parse the CSV in chunks and refresh the cache
+    # from them, replaying any rows ingested since
+    with tracing.span('load.csv'):
+        frames = list(_csv_chunks(source, key, CHUNK_ROWS, columns=columns, download=download))
+        df = concat_frames(frames)
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    df.attrs['source_key'] = frames[0].attrs.get('source_key') if frames else key
+    return df
+
+
+def key_columns(df, rows=None):
+    # The most specific key the table has and, with rows, that every row
+    # fills in; rows without an ID are matched by name instead
+    for columns in KEY_COLUMNS:
+        if all(c in df.columns for c in columns) and (
+                rows is None or all(c in rows.columns and rows[c].notna().all() for c in columns)):
+            return columns
+    if rows is None:
+        return list(df.columns)
+    return [c for c in df.columns if c in rows.columns and rows[c].notna().any()]
+
+
+def _align_rows(table, rows):
+    # rows with the table's columns, and its numeric types where a column
+    # has no missing values
+    rows = rows.reindex(columns=table.columns)
+    for col in table.columns:
+        if pd.api.types.is_numeric_dtype(table[col].dtype) and rows[col].notna().all():
+            rows[col] = rows[col].astype(table[col].dtype)
+    return rows
+
+
+def _concat_rows(table, rows):
+    # Columns either side leaves empty are filled in by the concatenation
+    columns = list(dict.fromkeys([*table.columns, *rows.columns]))
+    parts = [part.dropna(axis=1, how='all') for part in (table, rows)]
+    return pd.concat(parts, ignore_index=True).reindex(columns=columns)
+
+
+def unmatched_rows(table, rows):
+    # The rows whose key is not already in the table
+    columns = key_columns(table, rows)
+    candidates = table[columns]
+    if 'Games' in columns:
+        # Only rows of the same Games can share a key
+        candidates = candidates[candidates['Games'].isin(rows['Games'].unique())]
+    existing = pd.MultiIndex.from_frame(candidates.astype(str))
+    incoming = pd.MultiIndex.from_frame(rows[columns].astype(str))
+    return rows[~incoming.isin(existing)]
+
+
+def merge_athlete_rows(table, rows):
+    # Appends the rows whose key is not already in the table.
+    # Returns the merged table and the rows that were added.
+    new_rows = unmatched_rows(table, _align_rows(table, rows)).reset_index(drop=True)
+    if new_rows.empty:
+        return table, new_rows
+    return compact_frame(_concat_rows(table, new_rows)), compact_frame(new_rows)
+
+
+def append_athlete_rows(source, rows):
+    # Merges validated athlete rows into the stored dataset for a source
+    # and records them in its ingest log. Returns the rows that were new.
+    parquet_path, meta_path = _cache_paths(source)
+    table = read_athlete_table(source)
+    key = table.attrs.get('source_key')
+    if key is None:
+        raise ValueError(f"Cannot ingest into {source}: the source could not be read")
+
+    merged, new_rows = merge_athlete_rows(table, rows)
+    if new_rows.empty:
+        return new_rows
+
+    deltas_path = _ingest_paths(source)[0]
+    deltas = _read_parquet(deltas_path)
+    if deltas is not None:
+        logged = new_rows.reindex(columns=deltas.columns)
+        deltas = compact_frame(_concat_rows(deltas, logged))
+    else:
+        deltas = new_rows
+    _write_parquet(deltas, deltas_path)
+    _write_cache(merged, parquet_path, meta_path, source, key)
+    return new_rows
+
+
+def read_medal_tallies(source):
+    # Provisional nation medal counts (NOC, Games, Year, Season, Gold,
+    # Silver, Bronze) for Games without athlete-level results yet
+    return _read_parquet(_ingest_paths(source)[1])
+
+
+def store_medal_tally(source, tally):
+    # A newer tally for the same Games replaces the previous one
+    tallies_path = _ingest_paths(source)[1]
+    tallies = read_medal_tallies(source)
+    if tallies is not None:
+        tallies = tallies[~tallies['Games'].isin(tally['Games'].unique())]
+        tally = pd.concat([tallies, tally], ignore_index=True)
+    _write_parquet(tally.reset_index(drop=True), tallies_path)
+    return tally
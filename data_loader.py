@@ -1,15 +1,30 @@
 # data_loader.py
 
-import pandas as pd
 import streamlit as st
+from data_cache import read_athlete_table, VIEW_COLUMNS
 
-@st.cache_data
-def load_athlete_data():
-    file_id = '1JNNrACCcGZrNC86R5yEu_2UrJSsP9kfn'
-    url = f'https://drive.google.com/uc?id={file_id}'
+ATHLETE_DATA_URL = 'https://drive.google.com/uc?id=1JNNrACCcGZrNC86R5yEu_2UrJSsP9kfn'
+
+# One compact copy per process, shared read-only by every session;
+# callers must not modify the returned frame
+@st.cache_resource
+def load_athlete_data(columns=tuple(VIEW_COLUMNS)):
     try:
-        df = pd.read_csv(url)
+        df = read_athlete_table(ATHLETE_DATA_URL, columns=list(columns) if columns else None)
         return df
     except Exception as e:
         st.error(f"Error loading data from Google Drive: {e}")
         return None
+
+# Sport, event and athlete drill-downs, built once per process from the
+# athlete-level columns the medal views do not load
+@st.cache_resource
+def load_athlete_index():
+    from athlete_index import AthleteIndex, INDEX_COLUMNS
+
+    try:
+        df = read_athlete_table(ATHLETE_DATA_URL, columns=INDEX_COLUMNS)
+    except Exception as e:
+        st.error(f"Error loading data from Google Drive: {e}")
+        return None
+    return AthleteIndex.from_frame(df)
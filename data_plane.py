@@ -0,0 +1,230 @@
+# data_plane.py
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import tracing
+
+# Serving mode: one loader process publishes the compact athlete index and
+# the medal cubes as .npy files under a directory (ideally on tmpfs, e.g.
+# /dev/shm/olympic), and every dashboard process memory-maps them
+# read-only, so the operating system keeps a single copy however many
+# processes serve. Each publish goes to a new v<N> directory; the CURRENT
+# file is then replaced atomically, and readers swap when they see it change.
+# Loaders publishing to the same directory take turns on a lock file, which
+# needs fcntl, so serving mode is POSIX only.
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = '.publish.lock'
+KEEP_VERSIONS = 3
+MODES = ('athlete', 'nation')
+
+
+def _version_dir(root, version):
+    return os.path.join(root, f"v{version}")
+
+
+def current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _set_current(root, version):
+    tmp_path = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(f"{version}\n")
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+@contextlib.contextmanager
+def _publish_lock(root):
+    import fcntl
+
+    with open(os.path.join(root, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _prune(root, version):
+    # Processes still mapping an old version keep their pages until they
+    # swap; unlinking the files does not pull them away on POSIX systems
+    for name in os.listdir(root):
+        if name.startswith('v') and name[1:].isdigit() and int(name[1:]) <= version - KEEP_VERSIONS:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _cube_key(mode, by_region):
+    return f"cube-{mode}-region" if by_region else f"cube-{mode}"
+
+
+def source_state(source):
+    # Changes when the source or anything ingested on top of it changes
+    from data_cache import _ingest_paths, source_fingerprint
+
+    stamps = [os.path.getmtime(p) if os.path.exists(p) else None for p in _ingest_paths(source)]
+    return [source_fingerprint(source)] + stamps
+
+
+@tracing.traced('data_plane.publish')
+def publish(source, root):
+    # Loader side: builds everything the dashboard views read and publishes
+    # it as the next version. Returns the version number.
+    from athlete_index import INDEX_COLUMNS
+    from data_cache import read_athlete_table, read_medal_tallies, VIEW_COLUMNS
+
+    df = read_athlete_table(source, columns=list(dict.fromkeys(VIEW_COLUMNS + INDEX_COLUMNS)))
+    tallies = read_medal_tallies(source)
+    os.makedirs(root, exist_ok=True)
+    with _publish_lock(root):
+        return _publish(df, tallies, source, root)
+
+
+def _publish(df, tallies, source, root):
+    from athlete_index import AthleteIndex
+    from historical_data import add_medal_tallies, pivot_medal_table
+    from medal_cube import MedalCube
+    from noc_resolver import NocResolver
+
+    version = (current_version(root) or 0) + 1
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+    meta = {'version': version, 'source': str(source), 'source_key': df.attrs.get('source_key'),
+            'published_at': time.time(), 'cubes': {}}
+
+    try:
+        resolver = None
+        for mode in MODES:
+            medal_df = add_medal_tallies(pivot_medal_table(df, mode), tallies)
+            cube = MedalCube.from_frame(medal_df)
+            if resolver is None:
+                resolver = NocResolver.from_cube(cube, by_region=True)
+            for by_region, data in ((False, cube), (True, MedalCube.from_frame(resolver.roll_up(medal_df)))):
+                key = _cube_key(mode, by_region)
+                np.save(os.path.join(staging, f"{key}.counts.npy"), data.counts)
+                meta['cubes'][key] = {
+                    'nocs': [str(v) for v in data.nocs],
+                    'years': [int(v) for v in data.years],
+                    'seasons': [str(v) for v in data.seasons],
+                }
+
+        arrays, labels = AthleteIndex.from_frame(df).to_arrays()
+        for name, values in arrays.items():
+            np.save(os.path.join(staging, f"index.{name}.npy"), np.ascontiguousarray(values))
+        meta['index'] = {'arrays': sorted(arrays), 'labels': labels}
+
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.replace(staging, _version_dir(root, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _set_current(root, version)
+    _prune(root, version)
+    return version
+
+
+class DataPlane:
+    # One published version, memory-mapped read-only. Objects built from
+    # it are created once per process and shared by every session.
+
+    def __init__(self, root, version):
+        self.version = version
+        self.path = _version_dir(root, version)
+        with open(os.path.join(self.path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.source_key = self.meta.get('source_key')
+        # Every array is mapped on attach: the version can be pruned before
+        # a view first needs it, and only mapped files outlive the unlink
+        names = [f"{key}.counts" for key in self.meta['cubes']]
+        names += [f"index.{name}" for name in self.meta['index']['arrays']]
+        self._arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r') for name in names}
+        self._objects = {}
+        self._lock = threading.RLock()
+
+    def _array(self, name):
+        return self._arrays[name]
+
+    def _get(self, key, build):
+        with self._lock:
+            value = self._objects.get(key)
+            if value is None:
+                value = self._objects[key] = build()
+            return value
+
+    def cube(self, mode='athlete', by_region=False):
+        from medal_cube import MedalCube
+
+        key = _cube_key(mode, by_region)
+
+        def build():
+            labels = self.meta['cubes'][key]
+            return MedalCube(self._array(f"{key}.counts"), np.asarray(labels['nocs'], dtype=object),
+                             np.asarray(labels['years']), np.asarray(labels['seasons'], dtype=object))
+
+        return self._get(key, build)
+
+    def resolver(self, by_region=False):
+        from noc_resolver import NocResolver
+
+        return self._get(('resolver', by_region),
+                         lambda: NocResolver.from_cube(self.cube('athlete'), by_region=by_region))
+
+    def rankings(self, mode='athlete', by_region=False):
+        # Ranking tables are a few milliseconds of work over the mapped cube,
+        # so each process computes them once rather than publishing them
+        from ranking import Rankings, read_populations
+
+        return self._get(('rankings', mode, by_region),
+                         lambda: Rankings.from_cube(self.cube(mode, by_region), read_populations()))
+
+    def sport_rankings(self, mode='athlete'):
+        from ranking import Rankings, read_populations
+
+        return self._get(('sport_rankings', mode),
+                         lambda: Rankings.from_index(self.athlete_index(), mode, read_populations()))
+
+    def athlete_index(self):
+        from athlete_index import AthleteIndex
+
+        def build():
+            index = self.meta['index']
+            return AthleteIndex({name: self._array(f"index.{name}") for name in index['arrays']}, index['labels'])
+
+        return self._get('athlete_index', build)
+
+
+class DataPlaneClient:
+    # Reader side. current() checks the version counter (one small file
+    # read) and attaches to a newer version when one has been published.
+    # Callers take one plane per page run and use it throughout, so a swap
+    # never mixes versions within a page.
+
+    def __init__(self, root, on_swap=None):
+        self.root = root
+        self.on_swap = on_swap
+        self._plane = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        version = current_version(self.root)
+        with self._lock:
+            if version is not None and (self._plane is None or self._plane.version != version):
+                try:
+                    self._plane = DataPlane(self.root, version)
+                    tracing.count('data_plane.swap')
+                    if self.on_swap:
+                        self.on_swap(self._plane)
+                except (OSError, ValueError) as e:
+                    print(f"Could not attach data version {version}: {e}")
+            return self._plane
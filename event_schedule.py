@@ -0,0 +1,120 @@
+# event_schedule.py
+
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Upstream columns that identify an event row
+KEY_COLUMNS = ['Date', 'Discipline', 'Event', 'Venue', 'Start Time', 'End Time']
+
+
+def _row_hashes(event_df):
+    return pd.util.hash_pandas_object(event_df[KEY_COLUMNS].astype(str), index=False).to_numpy()
+
+
+def _as_ns(t):
+    if t is None:
+        return time.time_ns()
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    t = pd.Timestamp(t)
+    if t.tzinfo is None:
+        t = t.tz_localize('UTC')
+    return t.as_unit('ns').value
+
+
+def _positions(events, column):
+    if column not in events.columns:
+        return {}
+    return {k: np.asarray(v) for k, v in events.groupby(column, sort=False).indices.items()}
+
+
+class EventSchedule:
+    # Event schedule parsed once and sorted by start time. Start and end
+    # times are held as UTC nanoseconds for binary-search lookups, with
+    # secondary indexes from venue and discipline to row positions.
+    # Instances are never modified; apply_update returns a new schedule.
+
+    def __init__(self, events, keys):
+        self.events = events.reset_index(drop=True)
+        self.keys = np.asarray(keys)
+        self.starts = pd.DatetimeIndex(self.events['Start Time']).as_unit('ns').asi8
+        ends = pd.DatetimeIndex(self.events['End Time']).as_unit('ns')
+        self.ends = np.where(ends.isna(), self.starts, ends.asi8)
+        self.max_duration = int((self.ends - self.starts).max()) if len(self.starts) else 0
+        self._by_venue = _positions(self.events, 'Venue')
+        self._by_discipline = _positions(self.events, 'Discipline')
+
+    @classmethod
+    def from_frame(cls, event_df):
+        keys = _row_hashes(event_df)
+        events = event_df.copy()
+        events['Start Time'] = pd.to_datetime(events['Start Time'], errors='coerce', utc=True)
+        events['End Time'] = pd.to_datetime(events['End Time'], errors='coerce', utc=True)
+        valid = events['Start Time'].notna().to_numpy()
+        events, keys = events[valid], keys[valid]
+        order = np.argsort(pd.DatetimeIndex(events['Start Time']).as_unit('ns').asi8, kind='stable')
+        return cls(events.iloc[order], keys[order])
+
+    def apply_update(self, event_df):
+        # Parse only rows that are new upstream and merge them into the
+        # existing sorted order; rows no longer present are dropped.
+        keys = _row_hashes(event_df)
+        keep = np.isin(self.keys, keys)
+        is_new = ~np.isin(keys, self.keys)
+        if keep.all() and not is_new.any():
+            return self
+
+        added = EventSchedule.from_frame(event_df[is_new])
+        kept_events, kept_keys = self.events[keep], self.keys[keep]
+        slots = np.searchsorted(self.starts[keep], added.starts, side='right') + np.arange(len(added))
+
+        total = len(kept_events) + len(added)
+        from_added = np.zeros(total, dtype=bool)
+        from_added[slots] = True
+        take = np.empty(total, dtype=np.int64)
+        take[~from_added] = np.arange(len(kept_events))
+        take[from_added] = len(kept_events) + np.arange(len(added))
+
+        events = pd.concat([kept_events, added.events], ignore_index=True).iloc[take]
+        return EventSchedule(events, np.concatenate([kept_keys, added.keys])[take])
+
+    def __len__(self):
+        return len(self.events)
+
+    def next_event(self, now=None):
+        # First event starting strictly after now, or None
+        i = np.searchsorted(self.starts, _as_ns(now), side='right')
+        if i >= len(self.starts):
+            return None
+        return self.events.iloc[i]
+
+    def overlapping(self, start, end):
+        # Events running at any point in [start, end)
+        start_ns, end_ns = _as_ns(start), _as_ns(end)
+        lo = np.searchsorted(self.starts, start_ns - self.max_duration, side='left')
+        hi = np.searchsorted(self.starts, end_ns, side='left')
+        hit = (self.ends[lo:hi] > start_ns) | (self.starts[lo:hi] >= start_ns)
+        return self.events.iloc[lo + np.flatnonzero(hit)]
+
+    def on_day(self, zone, day=None):
+        # Events overlapping one calendar day in the given time zone
+        day = day or datetime.now(zone).date()
+        midnight = datetime(day.year, day.month, day.day, tzinfo=zone)
+        return self.overlapping(midnight, midnight + timedelta(days=1))
+
+    def by_venue(self, venue):
+        return self.events.iloc[self._by_venue.get(venue, [])]
+
+    def by_discipline(self, discipline):
+        return self.events.iloc[self._by_discipline.get(discipline, [])]
+
+    @property
+    def venues(self):
+        return sorted(self._by_venue)
+
+    @property
+    def disciplines(self):
+        return sorted(self._by_discipline)
@@ -0,0 +1,150 @@
+# forecast_cache.py
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import tracing
+from data_cache import CACHE_DIR
+
+# Forecast files kept on disk; the least recently used go first
+MAX_DISK_ENTRIES = 4096
+
+
+def series_key(years, totals, params):
+    # Fingerprint of a country's (Year, Total) series plus the model settings
+    digest = hashlib.sha256()
+    digest.update(np.asarray(years, dtype=np.int64).tobytes())
+    digest.update(np.asarray(totals, dtype=np.float64).tobytes())
+    digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ForecastCache:
+    # In-memory LRU in front of a directory of JSON files, itself kept to
+    # max_disk_entries files by last use. Keys are scoped to the data
+    # version, so processes reading different data (the CLI and the
+    # dashboard, or two sources) share the directory without evicting
+    # each other's forecasts wholesale.
+
+    def __init__(self, directory=None, max_entries=256, max_disk_entries=MAX_DISK_ENTRIES):
+        self.directory = directory or os.path.join(CACHE_DIR, 'forecasts')
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.data_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count = None
+        self.hits = 0
+        self.misses = 0
+
+    def _scoped(self, key):
+        version = self.data_version
+        if version is None:
+            return key
+        return hashlib.sha256(f"{version}:{key}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        key = self._scoped(key)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.count('forecast_cache.hit')
+                return value
+        try:
+            with open(self._path(key)) as f:
+                value = json.load(f)
+            # The file's modification time is its last use
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            tracing.count('forecast_cache.miss')
+            return None
+        with self._lock:
+            self.hits += 1
+            self._remember(key, value)
+        tracing.count('forecast_cache.hit')
+        return value
+
+    def put(self, key, value):
+        key = self._scoped(key)
+        with self._lock:
+            self._remember(key, value)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            existed = os.path.exists(path)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write forecast cache entry: {e}")
+            return
+        if not existed:
+            self._count_file()
+
+    def _files(self):
+        try:
+            return [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith('.json')]
+        except OSError:
+            return []
+
+    def _count_file(self):
+        # The directory is listed once, then counted as files are added;
+        # over the limit, it is pruned to 90% of it by last use
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = len(self._files())
+            else:
+                self._disk_count += 1
+            if self._disk_count <= self.max_disk_entries:
+                return
+            self._disk_count = None
+        files = []
+        for path in self._files():
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        files.sort()
+        for _, path in files[:max(len(files) - int(self.max_disk_entries * 0.9), 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._disk_count = None
+        for path in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def set_data_version(self, version):
+        # Forecasts made from other data stay on disk until the LRU limit
+        # retires them
+        if version is not None:
+            self.data_version = version
+
+
+forecast_cache = ForecastCache()
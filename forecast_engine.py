@@ -0,0 +1,101 @@
+# forecast_engine.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import tracing
+from forecast_cache import forecast_cache, series_key
+from forecasters import get_forecaster
+from historical_data import get_country_medal_counts
+from medal_cube import as_medal_cube
+
+
+def forecast_series(code, years, totals, forecaster=None):
+    # Cached single-country forecast; fits in-process on a miss
+    forecaster = get_forecaster(forecaster)
+    key = series_key(years, totals, forecaster.cache_params)
+    result = forecast_cache.get(key)
+    if result is None:
+        with tracing.span(f'forecast.fit.{forecaster.name}'):
+            result = forecaster.forecast([(code, years, totals)])[0]
+        forecast_cache.put(key, result)
+    return dict(result, code=code)
+
+
+def _country_series(historical_df, codes):
+    jobs, skipped = [], []
+    for code in codes:
+        medal_counts = get_country_medal_counts(historical_df, code)
+        if medal_counts is None or medal_counts.empty:
+            skipped.append({'code': code, 'error': f"No data available for {code}."})
+        elif len(medal_counts) < 2:
+            skipped.append({'code': code, 'error': f"Not enough data to predict for {code}."})
+        else:
+            jobs.append((code, medal_counts['Year'].tolist(), medal_counts['Total'].tolist()))
+    return jobs, skipped
+
+
+def iter_forecasts(historical_df, country_codes, forecaster=None, max_workers=None):
+    # Yields one result dict per country as soon as its forecast is ready.
+    # Countries that cannot be forecast yield a dict with an 'error' message.
+    forecaster = get_forecaster(forecaster)
+    jobs, skipped = _country_series(historical_df, country_codes)
+    yield from skipped
+
+    # Cached forecasts are served first; only the misses are fitted
+    misses = []
+    for code, years, totals in jobs:
+        key = series_key(years, totals, forecaster.cache_params)
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            yield dict(cached, code=code)
+        else:
+            misses.append((key, (code, years, totals)))
+
+    # Vectorized backends fit every missing country in one batched solve
+    if forecaster.batched or len(misses) <= 1:
+        with tracing.span(f'forecast.fit.{forecaster.name}'):
+            results = forecaster.forecast([job for _, job in misses]) if misses else []
+        for (key, _), result in zip(misses, results):
+            forecast_cache.put(key, result)
+            yield result
+        return
+
+    workers = min(len(misses), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(forecaster.fit_one, *job): (key, job[0]) for key, job in misses}
+        for future in as_completed(futures):
+            key, code = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                yield {'code': code, 'error': f"Forecast failed for {code}: {e}"}
+                continue
+            forecast_cache.put(key, result)
+            yield result
+
+
+def forecast_all_nocs(historical_df, output_path, forecaster=None, max_workers=None):
+    # Forecast the next Games for every NOC and write a table to serve from
+    cube = as_medal_cube(historical_df)
+    rows = []
+    for result in iter_forecasts(cube, list(cube.nocs), forecaster=forecaster, max_workers=max_workers):
+        if 'error' in result:
+            continue
+        rows.append({
+            'NOC': result['code'],
+            'Year': result['forecast_years'][-1],
+            'Prediction': max(0, int(result['yhat'][-1])),
+            'Lower Bound': int(result['yhat_lower'][-1]),
+            'Upper Bound': int(result['yhat_upper'][-1]),
+        })
+
+    table = pd.DataFrame(rows, columns=['NOC', 'Year', 'Prediction', 'Lower Bound', 'Upper Bound'])
+    table = table.sort_values('NOC').reset_index(drop=True)
+    if output_path.endswith('.parquet'):
+        table.to_parquet(output_path, index=False)
+    else:
+        table.to_csv(output_path, index=False)
+    return table
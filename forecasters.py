@@ -0,0 +1,207 @@
+# forecasters.py
+
+import numpy as np
+import pandas as pd
+
+# Prophet's default uncertainty interval is 80%
+INTERVAL_Z = 1.2816
+GAMES_INTERVAL = 4
+
+
+def fit_prophet_forecast(code, years, totals):
+    # Runs in a worker process; only the (Year, Total) series is shipped over
+    from prophet import Prophet
+
+    df = pd.DataFrame({'ds': pd.to_datetime([str(y) for y in years], format='%Y'), 'y': totals})
+    model = Prophet()
+    model.fit(df)
+
+    future = pd.date_range(start=df['ds'].max(), periods=2, freq='4YS')
+    forecast = model.predict(pd.DataFrame({'ds': future}))
+    return {
+        'code': code,
+        'years': [int(y) for y in years],
+        'history': [int(t) for t in totals],
+        'forecast_years': [int(d.year) for d in forecast['ds']],
+        'yhat': forecast['yhat'].tolist(),
+        'yhat_lower': forecast['yhat_lower'].tolist(),
+        'yhat_upper': forecast['yhat_upper'].tolist(),
+    }
+
+
+def _pad_series(series):
+    # Right-align every series in an (n, L) matrix so the last Games share a column
+    length = max(len(years) for _, years, _ in series)
+    years = np.zeros((len(series), length))
+    totals = np.zeros((len(series), length))
+    mask = np.zeros((len(series), length), dtype=bool)
+    for i, (_, y, t) in enumerate(series):
+        years[i, length - len(y):] = y
+        totals[i, length - len(t):] = t
+        mask[i, length - len(y):] = True
+    return years, totals, mask
+
+
+def _results(series, yhat, lower, upper):
+    results = []
+    for i, (code, years, totals) in enumerate(series):
+        last = int(years[-1])
+        results.append({
+            'code': code,
+            'years': [int(y) for y in years],
+            'history': [int(t) for t in totals],
+            'forecast_years': [last, last + GAMES_INTERVAL],
+            'yhat': yhat[i].tolist(),
+            'yhat_lower': lower[i].tolist(),
+            'yhat_upper': upper[i].tolist(),
+        })
+    return results
+
+
+class Forecaster:
+    # Backends forecast the last and next Games for a batch of
+    # (code, years, totals) series and return one result dict per series.
+    name = None
+    label = None
+    batched = True
+
+    def __init__(self, **params):
+        self.params = params
+
+    @property
+    def cache_params(self):
+        return dict(self.params, model=self.name)
+
+    def forecast(self, series):
+        raise NotImplementedError
+
+
+class WeightedLeastSquaresForecaster(Forecaster):
+    # Polynomial trend fitted with exponentially decaying weights on older
+    # Games; every country is solved at once as a stack of normal equations.
+    name = 'wls'
+    label = 'Weighted Least Squares'
+
+    def __init__(self, degree=1, halflife=3.0):
+        super().__init__(degree=degree, halflife=halflife)
+
+    def _weights(self, mask):
+        halflife = self.params['halflife']
+        if not halflife:
+            return mask.astype(float)
+        age = mask.shape[1] - 1 - np.arange(mask.shape[1])
+        return mask * 0.5 ** (age / halflife)
+
+    def forecast(self, series):
+        # A series of n Games is fitted with degree at most n - 1, so short
+        # histories get a trend they can determine; series are solved
+        # together in groups of equal degree
+        groups = {}
+        for i, (_, years, _) in enumerate(series):
+            groups.setdefault(max(min(self.params['degree'], len(years) - 1), 0), []).append(i)
+        results = [None] * len(series)
+        for degree, rows in groups.items():
+            for i, result in zip(rows, self._fit([series[i] for i in rows], degree)):
+                results[i] = result
+        return results
+
+    def _fit(self, series, degree):
+        years, totals, mask = _pad_series(series)
+        w = self._weights(mask)
+
+        # Time in Games steps relative to each country's last Games
+        x = np.where(mask, (years - years[:, -1:]) / GAMES_INTERVAL, 0.0)
+        X = x[..., None] ** np.arange(degree + 1)
+        XtW = X.transpose(0, 2, 1) * w[:, None, :]
+        A = XtW @ X + 1e-8 * np.eye(degree + 1)
+        b = XtW @ totals[..., None]
+        A_inv = np.linalg.inv(A)
+        beta = (A_inv @ b)[..., 0]
+
+        residuals = (totals - (X @ beta[..., None])[..., 0]) * mask
+        dof = np.maximum(w.sum(axis=1) - (degree + 1), 1)
+        s2 = (w * residuals ** 2).sum(axis=1) / dof
+
+        X_new = np.array([0.0, 1.0])[:, None] ** np.arange(degree + 1)
+        yhat = beta @ X_new.T
+        leverage = np.einsum('pk,nkj,pj->np', X_new, A_inv, X_new)
+        spread = INTERVAL_Z * np.sqrt(s2[:, None] * (1 + leverage))
+        return _results(series, yhat, yhat - spread, yhat + spread)
+
+
+class PolynomialForecaster(WeightedLeastSquaresForecaster):
+    name = 'polynomial'
+    label = 'Polynomial'
+
+    def __init__(self, degree=2):
+        super().__init__(degree=degree, halflife=None)
+
+
+class ExponentialSmoothingForecaster(Forecaster):
+    # Holt's linear trend smoothing, stepped through time for all countries at once
+    name = 'holt'
+    label = 'Exponential Smoothing'
+
+    def __init__(self, alpha=0.5, beta=0.3):
+        super().__init__(alpha=alpha, beta=beta)
+
+    def forecast(self, series):
+        _, totals, mask = _pad_series(series)
+        alpha, beta = self.params['alpha'], self.params['beta']
+        n, length = totals.shape
+
+        first = mask.argmax(axis=1)
+        level = totals[np.arange(n), first]
+        trend = np.zeros(n)
+        sq_error = np.zeros(n)
+        steps = np.zeros(n)
+        fitted_last = level.copy()
+        for t in range(length):
+            active = mask[:, t] & (t > first)
+            predicted = level + trend
+            error = totals[:, t] - predicted
+            new_level = alpha * totals[:, t] + (1 - alpha) * predicted
+            new_trend = beta * (new_level - level) + (1 - beta) * trend
+            sq_error = np.where(active, sq_error + error ** 2, sq_error)
+            steps = np.where(active, steps + 1, steps)
+            fitted_last = np.where(active, predicted, fitted_last)
+            level = np.where(active, new_level, level)
+            trend = np.where(active, new_trend, trend)
+
+        s = np.sqrt(sq_error / np.maximum(steps, 1))
+        yhat = np.stack([fitted_last, level + trend], axis=1)
+        spread = INTERVAL_Z * s[:, None] * np.ones(2)
+        return _results(series, yhat, yhat - spread, yhat + spread)
+
+
+class ProphetForecaster(Forecaster):
+    # Full Stan model; imported lazily and fitted one country at a time
+    name = 'prophet'
+    label = 'Prophet'
+    batched = False
+
+    def fit_one(self, code, years, totals):
+        return fit_prophet_forecast(code, years, totals)
+
+    def forecast(self, series):
+        return [self.fit_one(*s) for s in series]
+
+
+FORECASTERS = {
+    cls.name: cls for cls in (
+        ProphetForecaster,
+        PolynomialForecaster,
+        ExponentialSmoothingForecaster,
+        WeightedLeastSquaresForecaster,
+    )
+}
+DEFAULT_FORECASTER = 'prophet'
+
+
+def get_forecaster(forecaster=None, **params):
+    if isinstance(forecaster, Forecaster):
+        return forecaster
+    name = forecaster or DEFAULT_FORECASTER
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster: {name}")
+    return FORECASTERS[name](**params)
@@ -1,19 +1,142 @@
+import numpy as np
 import pandas as pd
+from data_cache import iter_athlete_table, read_medal_tallies, compact_frame, concat_frames, _concat_rows, CHUNK_ROWS, VIEW_COLUMNS
+from medal_cube import as_medal_cube, register_cube, MedalCube, MEDALS
+from forecast_cache import forecast_cache
+import tracing
 
-def load_historical_data(filepath):
-    df = pd.read_csv(filepath)
+# 'athlete' counts every medalled athlete row, 'nation' counts a team medal once
+MEDAL_MODES = ('athlete', 'nation')
+
+def _row_keys(df, columns):
+    # Combine the factorized key columns into one int64 key per row
+    key = np.zeros(len(df), dtype=np.int64)
+    radix = 1
+    for col in columns:
+        codes, uniques = pd.factorize(df[col])
+        size = len(uniques) + 1
+        if radix * size >= 2 ** 62:
+            key, _ = pd.factorize(key)
+            radix = int(key.max()) + 2 if len(key) else 1
+        key = key * size + (codes + 1)
+        radix *= size
+    return key
+
+def _team_columns(df):
+    games = ['Games'] if 'Games' in df.columns else ['Year', 'Season']
+    return games + ['Event', 'NOC', 'Medal']
+
+def _row_hashes(df, columns):
+    # Like _row_keys, but a row's key does not depend on the other rows,
+    # so keys from different chunks can be compared
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy().view(np.int64)
+
+def dedupe_team_medals(df):
+    key = _row_keys(df, _team_columns(df))
+    return df[~pd.Series(key).duplicated().to_numpy()]
+
+def select_medal_rows(df, mode='athlete'):
+    if mode not in MEDAL_MODES:
+        raise ValueError(f"Unknown medal counting mode: {mode}")
     df = df[df['Medal'].notna()]
+    if mode == 'nation':
+        df = dedupe_team_medals(df)
+    return df
+
+@tracing.traced('aggregate.pivot')
+def pivot_medal_table(df, mode='athlete'):
+    # Collapse athlete rows to one row per Games and NOC with medal counts
+    if all(m in df.columns for m in MEDALS):
+        return df
+    df = select_medal_rows(df, mode)
+    keys = ['Year', 'Season', 'NOC'] if 'Season' in df.columns else ['Year', 'NOC']
+    medal_counts = df.groupby(keys + ['Medal'], observed=True).size().unstack(fill_value=0)
+    for medal in MEDALS:
+        if medal not in medal_counts.columns:
+            medal_counts[medal] = 0
+    medal_counts = medal_counts[MEDALS]
+    medal_counts.columns = list(MEDALS)
+    return medal_counts.reset_index()
+
+def add_medal_tallies(medal_df, tallies):
+    # Provisional nation tallies count only for Games that have no
+    # athlete-level results yet
+    if tallies is None or tallies.empty:
+        return medal_df
+    games = ['Games'] if 'Games' in medal_df.columns else ['Year', 'Season']
+    known = pd.MultiIndex.from_frame(medal_df[games].astype(str).drop_duplicates())
+    pending = tallies[~pd.MultiIndex.from_frame(tallies[games].astype(str)).isin(known)]
+    if pending.empty:
+        return medal_df
+    pending = pending[[c for c in medal_df.columns if c in pending.columns]]
+    return compact_frame(pd.concat([medal_df, pending], ignore_index=True))
+
+def medal_rows(df, mode='athlete'):
+    df = select_medal_rows(df, mode).copy()
     df['Gold'] = df['Medal'] == 'Gold'
     df['Silver'] = df['Medal'] == 'Silver'
     df['Bronze'] = df['Medal'] == 'Bronze'
-    df['Gold'] = df['Gold'].astype(int)
-    df['Silver'] = df['Silver'].astype(int)
-    df['Bronze'] = df['Bronze'].astype(int)
+    df['Gold'] = df['Gold'].astype('int8')
+    df['Silver'] = df['Silver'].astype('int8')
+    df['Bronze'] = df['Bronze'].astype('int8')
     return df
 
+@tracing.traced('load.historical_stream')
+def load_historical_data(filepath, columns=VIEW_COLUMNS, mode='athlete', chunksize=CHUNK_ROWS, progress=None):
+    # Streams the athlete table, keeping only the medal rows of each chunk
+    # and folding them into the medal cube as they arrive, so memory is
+    # bounded by the chunk size plus the medal rows kept.
+    # progress(rows, fraction) is called after each chunk.
+    parts, cube, chunk = [], None, None
+    seen = np.empty(0, dtype=np.int64)
+    for chunk in iter_athlete_table(filepath, columns, chunksize, progress):
+        rows = select_medal_rows(chunk, mode)
+        if mode == 'nation' and len(rows):
+            # A team's rows can straddle two chunks; the team medals already
+            # counted are kept as a sorted array of row hashes
+            keys = _row_hashes(rows, _team_columns(rows))
+            new = ~np.isin(keys, seen)
+            rows = rows[new]
+            seen = np.union1d(seen, keys[new])
+        if rows.empty:
+            continue
+        parts.append(rows)
+        cube = MedalCube.from_frame(rows) if cube is None else cube.merge(rows)
+
+    if chunk is None:
+        raise ValueError(f"No rows found in {filepath}")
+    forecast_cache.set_data_version(chunk.attrs.get('source_key'))
+    df = medal_rows(concat_frames(parts or [chunk.iloc[:0]]))
+    with_tallies = add_medal_tallies(df, read_medal_tallies(filepath))
+    if cube is None:
+        cube = MedalCube.from_frame(with_tallies)
+    elif len(with_tallies) > len(df):
+        cube = cube.merge(with_tallies.iloc[len(df):])
+    register_cube(with_tallies, cube)
+    return with_tallies
+
+def update_historical_data(historical_df, rows, mode='athlete'):
+    # Adds newly ingested athlete rows or tally rows to a loaded table.
+    # The medal cube is updated in place of a rebuild, so only the
+    # countries in rows lose their cached series.
+    if all(m in rows.columns for m in MEDALS):
+        new = rows
+    else:
+        new = medal_rows(rows, mode)
+        if mode == 'nation':
+            # Team medals already counted for these Games are not counted again
+            earlier = historical_df[historical_df['Year'].isin(new['Year'].unique())]
+            if not earlier.empty:
+                both = dedupe_team_medals(_concat_rows(earlier, new))
+                new = both[both.index >= len(earlier)]
+    new = new[[c for c in historical_df.columns if c in new.columns]]
+    if new.empty:
+        return historical_df
+
+    cube = as_medal_cube(historical_df).merge(new)
+    updated = compact_frame(_concat_rows(historical_df, new))
+    register_cube(updated, cube)
+    return updated
+
 def get_country_medal_counts(df, country_code):
-    country_data = df[df['NOC'] == country_code]
-    medal_counts = country_data.groupby('Year')[['Gold', 'Silver', 'Bronze']].sum()
-    medal_counts['Total'] = medal_counts.sum(axis=1)
-    medal_counts = medal_counts.reset_index()
-    return medal_counts
+    return as_medal_cube(df).country_by_year(country_code)
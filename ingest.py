@@ -0,0 +1,159 @@
+# ingest.py
+
+import pandas as pd
+
+from data_cache import MEDAL_CATEGORIES, append_athlete_rows, store_medal_tally
+from historical_data import load_historical_data, update_historical_data
+from medal_cube import as_medal_cube, MEDALS
+from noc_resolver import NocResolver, last_active_years, read_noc_regions
+
+REQUIRED_COLUMNS = ['NOC', 'Year', 'Season', 'Event', 'Medal']
+SEASONS = ('Summer', 'Winter')
+
+
+def _read_delta(delta):
+    if isinstance(delta, pd.DataFrame):
+        return delta.copy()
+    if str(delta).endswith('.parquet'):
+        return pd.read_parquet(delta)
+    return pd.read_csv(delta)
+
+
+def _require(df, columns, what):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"{what} is missing required columns: {', '.join(missing)}")
+
+
+def _games_columns(df):
+    # Normalizes Year and Season and derives the Games label from them
+    year = pd.to_numeric(df['Year'], errors='coerce')
+    bad = year.isna() | (year % 1 != 0)
+    if bad.any():
+        raise ValueError(f"{int(bad.sum())} rows have an invalid Year.")
+    df['Year'] = year.astype('int64')
+
+    df['Season'] = df['Season'].astype(str).str.strip().str.title()
+    bad = ~df['Season'].isin(SEASONS)
+    if bad.any():
+        raise ValueError(f"Unknown Season values: {', '.join(sorted(df.loc[bad, 'Season'].unique()))}")
+
+    games = df['Year'].astype(str) + ' ' + df['Season']
+    if 'Games' in df.columns:
+        mismatch = df['Games'].notna() & (df['Games'].astype(str) != games)
+        if mismatch.any():
+            raise ValueError(f"{int(mismatch.sum())} rows have a Games label that does not match Year and Season.")
+    df['Games'] = games
+    return df
+
+
+def _noc_codes(codes):
+    if codes.isna().any():
+        raise ValueError(f"{int(codes.isna().sum())} rows have no NOC code.")
+    codes = codes.astype(str).str.strip().str.upper()
+    bad = ~codes.str.fullmatch(r'[A-Z]{3}')
+    if bad.any():
+        raise ValueError(f"Invalid NOC codes: {', '.join(sorted(codes[bad].unique()))}")
+    return codes
+
+
+def validate_athlete_rows(delta):
+    # Checks a delta of athlete results against the athlete_events schema.
+    # Raises ValueError describing the first problem found.
+    df = _read_delta(delta)
+    _require(df, REQUIRED_COLUMNS, "Delta")
+    df = _games_columns(df)
+    df['NOC'] = _noc_codes(df['NOC'])
+    medal = df['Medal'].astype(object).where(df['Medal'].notna())
+    bad = medal.notna() & ~medal.isin(MEDAL_CATEGORIES)
+    if bad.any():
+        raise ValueError(f"Unknown Medal values: {', '.join(sorted(map(str, medal[bad].unique())))}")
+    df['Medal'] = medal
+    return df.drop_duplicates()
+
+
+def tally_medal_rows(tally, year, season='Summer', resolver=None):
+    # Turns a live medal tally into nation medal counts for one Games.
+    # Uses the tally's NOC column when it has one, otherwise matches
+    # country names and aliases; names shared by several NOCs (Germany:
+    # GER, FRG, GDR) resolve to the one that competed most recently.
+    df = tally.copy()
+    _require(df, MEDALS, "Medal tally")
+    if 'NOC' not in df.columns:
+        _require(df, ['Country'], "Medal tally")
+        resolver = resolver or NocResolver(read_noc_regions())
+        df['NOC'] = df['Country'].map(resolver.resolve)
+        unknown = df.loc[df['NOC'].isna(), 'Country']
+        if not unknown.empty:
+            raise ValueError(f"Could not match countries to NOC codes: {', '.join(map(str, unknown))}")
+    df['NOC'] = _noc_codes(df['NOC'])
+    if df['NOC'].duplicated().any():
+        raise ValueError(f"Medal tally lists a country twice: {', '.join(df.loc[df['NOC'].duplicated(), 'NOC'])}")
+
+    counts = df[MEDALS].apply(pd.to_numeric, errors='coerce')
+    if counts.isna().any().any() or (counts < 0).any().any():
+        raise ValueError("Medal counts must be non-negative numbers.")
+
+    rows = pd.DataFrame({'NOC': df['NOC'].to_numpy(), 'Year': year, 'Season': season})
+    rows = _games_columns(rows)
+    for medal in MEDALS:
+        rows[medal] = counts[medal].astype('int64').to_numpy()
+    return rows[['NOC', 'Games', 'Year', 'Season'] + MEDALS]
+
+
+def refresh_forecasts(historical_df, country_codes, forecaster=None):
+    # Forecasts are cached by series content, so only the countries whose
+    # series changed are fitted again
+    from forecast_engine import iter_forecasts
+
+    country_codes = list(country_codes)
+    print(f"Refreshing forecasts for {len(country_codes)} countries...")
+    try:
+        return list(iter_forecasts(historical_df, country_codes, forecaster=forecaster))
+    except Exception as e:
+        print(f"Could not refresh forecasts: {e}")
+        return []
+
+
+def ingest_delta(source, delta, historical_df=None, mode='athlete', forecaster=None, refresh=True):
+    # Appends new athlete results to the stored dataset for source. With a
+    # loaded historical table, returns it updated with the new medals and
+    # the affected countries' forecasts refreshed.
+    rows = validate_athlete_rows(delta)
+    new_rows = append_athlete_rows(source, rows)
+    print(f"Ingested {len(new_rows)} new rows ({len(rows) - len(new_rows)} already present).")
+    if historical_df is None or new_rows.empty:
+        return historical_df
+
+    # Athlete results supersede a stored tally for the same Games; that
+    # rare case reloads instead of subtracting the tally back out
+    provisional = historical_df['Medal'].isna() & historical_df['Games'].isin(new_rows['Games'].unique())
+    if provisional.any():
+        updated = load_historical_data(source, mode=mode)
+    else:
+        updated = update_historical_data(historical_df, new_rows, mode)
+    if updated is not historical_df and refresh:
+        refresh_forecasts(updated, new_rows.loc[new_rows['Medal'].notna(), 'NOC'].unique(), forecaster)
+    return updated
+
+
+def ingest_medal_tally(source, tally, year, season='Summer', historical_df=None, forecaster=None, refresh=True):
+    # Stores a final live medal tally as provisional results for its Games.
+    # They are replaced by athlete-level results once those are ingested.
+    resolver = None
+    if historical_df is not None:
+        # New Games can bring NOCs the loaded data has not seen yet
+        regions = read_noc_regions()
+        last_active = last_active_years(as_medal_cube(historical_df))
+        resolver = NocResolver(regions, last_active, codes=set(regions) | set(last_active))
+    rows = tally_medal_rows(tally, year, season, resolver)
+    if historical_df is not None and rows['Games'].iloc[0] in set(historical_df['Games'].astype(str)):
+        raise ValueError(f"{rows['Games'].iloc[0]} already has results in the loaded data.")
+    store_medal_tally(source, rows)
+    print(f"Stored the {rows['Games'].iloc[0]} medal tally for {len(rows)} countries.")
+    if historical_df is None:
+        return historical_df
+    updated = update_historical_data(historical_df, rows)
+    if updated is not historical_df and refresh:
+        refresh_forecasts(updated, rows['NOC'].unique(), forecaster)
+    return updated
@@ -0,0 +1,116 @@
+# live_client.py
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import tracing
+
+BASE_URL = os.environ.get('OLYMPIC_API_URL', "https://apis.codante.io/olympic-games")
+
+
+class LiveDataClient:
+    # One pooled session and one response cache shared by every caller in
+    # the process. Fresh entries are served from memory; entries past their
+    # TTL are served stale while a background request revalidates them with
+    # If-None-Match / If-Modified-Since.
+
+    def __init__(self, base_url=BASE_URL, ttl=30, max_stale=600, timeout=(3.05, 10), pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                        allowed_methods=['GET', 'HEAD'])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_json(self, path, fresh=False):
+        # fresh=True always goes upstream (still conditionally)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and not fresh:
+            age = time.monotonic() - entry['fetched_at']
+            if age < self.ttl:
+                tracing.count('live_client.hit')
+                return entry['data']
+            if age < self.ttl + self.max_stale:
+                tracing.count('live_client.hit')
+                tracing.count('live_client.stale')
+                self._revalidate_async(path)
+                return entry['data']
+        tracing.count('live_client.miss')
+        return self._fetch(path)
+
+    def _fetch(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with tracing.span('live.fetch'):
+            response = self.session.get(f"{self.base_url}{path}", headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry is not None:
+            tracing.count('live.not_modified')
+            entry = dict(entry, fetched_at=time.monotonic())
+        else:
+            response.raise_for_status()
+            with tracing.span('live.parse_json'):
+                data = response.json()
+            entry = {
+                'data': data,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.monotonic(),
+            }
+        with self._lock:
+            self._entries[path] = entry
+        return entry['data']
+
+    def _revalidate_async(self, path):
+        with self._lock:
+            if path in self._refreshing:
+                return
+            self._refreshing.add(path)
+
+        def run():
+            try:
+                self._fetch(path)
+            except requests.exceptions.RequestException as e:
+                print(f"Background refresh of {path} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(path)
+
+        threading.Thread(target=run, name=f"live-refresh{path}", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LiveDataClient()
+        return _client
@@ -1,30 +1,31 @@
 import requests
 import pandas as pd
+from live_client import get_client
 
-BASE_URL = "https://apis.codante.io/olympic-games"
-
-def fetch_medal_tally():
+def fetch_medal_tally(fresh=False):
     try:
-        response = requests.get(f"{BASE_URL}/countries")
-        response.raise_for_status()
-        data = response.json().get('data', [])
+        data = get_client().get_json('/countries', fresh=fresh).get('data', [])
         df = pd.DataFrame(data)
         if df.empty:
             print("No medal data available.")
             return None
-        df = df[['name', 'gold_medals', 'silver_medals', 'bronze_medals', 'total_medals', 'rank']]
-        df.columns = ['Country', 'Gold', 'Silver', 'Bronze', 'Total', 'Rank']
+        columns = ['name', 'gold_medals', 'silver_medals', 'bronze_medals', 'total_medals', 'rank']
+        names = ['Country', 'Gold', 'Silver', 'Bronze', 'Total', 'Rank']
+        # The country id is its NOC code, used when ingesting a final tally
+        if 'id' in df.columns:
+            columns.append('id')
+            names.append('NOC')
+        df = df[columns]
+        df.columns = names
         df = df.sort_values(by='Rank')
         return df
     except requests.exceptions.RequestException as e:
         print(f"Error fetching medal tally: {e}")
         return None
 
-def fetch_event_schedule():
+def fetch_event_schedule(fresh=False):
     try:
-        response = requests.get(f"{BASE_URL}/events")
-        response.raise_for_status()
-        data = response.json().get('data', [])
+        data = get_client().get_json('/events', fresh=fresh).get('data', [])
         if not data:
             print("No event data available.")
             return None
@@ -0,0 +1,149 @@
+# live_poller.py
+
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from event_schedule import EventSchedule
+from live_data import fetch_medal_tally, fetch_event_schedule
+
+# Published snapshots are shared by every session and must not be mutated;
+# views copy a frame before adding columns to it.
+LiveSnapshot = namedtuple(
+    'LiveSnapshot', ['version', 'fetched_at', 'medal_tally', 'event_schedule', 'schedule', 'changes']
+)
+
+EMPTY_SNAPSHOT = LiveSnapshot(0, None, None, None, None, {})
+EVENT_KEY = ['Discipline', 'Event', 'Start Time']
+
+
+def diff_medal_tally(old, new):
+    # Countries whose medal counts changed, with the change per medal
+    if new is None:
+        return None
+    counts = ['Gold', 'Silver', 'Bronze', 'Total']
+    if old is None:
+        return new[['Country'] + counts].reset_index(drop=True)
+    merged = new[['Country'] + counts].merge(
+        old[['Country'] + counts], on='Country', how='left', suffixes=('', '_prev')
+    )
+    previous = merged[[c + '_prev' for c in counts]].fillna(0).to_numpy()
+    delta = merged[counts].to_numpy() - previous
+    changed = (delta != 0).any(axis=1)
+    result = pd.DataFrame(delta[changed].astype(int), columns=counts)
+    result.insert(0, 'Country', merged.loc[changed, 'Country'].to_numpy())
+    return result
+
+
+def diff_event_schedule(old, new):
+    if new is None:
+        return 0, 0
+    new_keys = set(map(tuple, new[EVENT_KEY].astype(str).to_numpy()))
+    if old is None:
+        return len(new_keys), 0
+    old_keys = set(map(tuple, old[EVENT_KEY].astype(str).to_numpy()))
+    return len(new_keys - old_keys), len(old_keys - new_keys)
+
+
+def _same(old, new):
+    if old is None or new is None:
+        return old is new
+    return old.equals(new)
+
+
+class LivePoller:
+    # Single background thread that refreshes the live feeds on a fixed
+    # interval, so upstream load does not grow with the number of viewers.
+
+    def __init__(self, interval=30):
+        self.interval = interval
+        self._snapshot = EMPTY_SNAPSHOT
+        self._published = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def wait_for_snapshot(self, timeout=None):
+        # Only the very first viewer ever waits, for the initial fetch
+        self._published.wait(timeout)
+        return self._snapshot
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='live-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Live poll failed: {e}")
+            finally:
+                # Viewers get the last (or empty) snapshot at once, even
+                # when this attempt failed
+                self._published.set()
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        previous = self._snapshot
+        tally = fetch_medal_tally(fresh=True)
+        schedule = fetch_event_schedule(fresh=True)
+
+        answered = tally is not None and schedule is not None
+        # Keep the last good frame when a feed is temporarily unavailable
+        if tally is None:
+            tally = previous.medal_tally
+        if schedule is None:
+            schedule = previous.event_schedule
+
+        if previous.version and _same(previous.medal_tally, tally) and _same(previous.event_schedule, schedule):
+            # Same version, so subscribers are not told; only the fetch
+            # time moves on, and only when both feeds answered
+            if answered:
+                self._snapshot = previous._replace(fetched_at=time.time())
+            self._published.set()
+            return self._snapshot
+
+        added, removed = diff_event_schedule(previous.event_schedule, schedule)
+        changes = {
+            'medal_tally': diff_medal_tally(previous.medal_tally, tally),
+            'events_added': added,
+            'events_removed': removed,
+        }
+        # Upstream schedule changes are merged into the existing index
+        if schedule is None:
+            index = None
+        elif previous.schedule is None:
+            index = EventSchedule.from_frame(schedule)
+        else:
+            index = previous.schedule.apply_update(schedule)
+        snapshot = LiveSnapshot(previous.version + 1, time.time(), tally, schedule, index, changes)
+        self._snapshot = snapshot
+        self._published.set()
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Live snapshot subscriber failed: {e}")
+        return snapshot
@@ -1,17 +1,59 @@
-from live_data import fetch_medal_tally, fetch_event_schedule
-from historical_data import load_historical_data, get_country_medal_counts
-from visualization import (
-    plot_interactive_medals,
-    plot_country_medal_trend,
-    plot_country_pie,
-    compare_two_countries,
-    radar_compare_countries
-)
-from prediction import predict_future_medals
-from multi_country_prediction import predict_multiple_countries_shared_plot
+import argparse
+import os
+import sys
+
+# Heavy modules (pandas, plotly, prophet) are imported by the menu option
+# that needs them, so the menu appears without paying for them up front.
+
+def show_figure(fig):
+    if fig is not None:
+        fig.show()
+
+def install_completer(resolver):
+    # Tab completes NOC codes from codes, country names and historic names
+    try:
+        import readline
+    except ImportError:
+        return
+
+    def complete(text, state):
+        matches = resolver.complete(text)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(complete)
+    readline.set_completer_delims(',')
+    readline.parse_and_bind('tab: complete')
+
+def read_countries(resolver, prompt):
+    # Accepts NOC codes, country names and historic names, reporting the rest
+    codes, unknown = resolver.resolve_many(input(prompt).split(','))
+    for text in unknown:
+        suggestions = resolver.suggest(text)
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        print(f"Unknown country '{text}'.{hint}")
+    return codes
+
+def read_country(resolver, prompt):
+    codes = read_countries(resolver, prompt)
+    return codes[0] if codes else None
+
+def roll_up_regions(historical_df, resolver):
+    from medal_cube import as_medal_cube, register_cube
+
+    # The cube is built from the rolled-up rows once, here
+    rolled = resolver.roll_up(historical_df)
+    register_cube(rolled, as_medal_cube(rolled))
+    return rolled
+
+def show_load_progress(rows, fraction):
+    # Large files are streamed in chunks; one status line is rewritten per chunk
+    done = f"{fraction:.0%}, " if fraction is not None else ''
+    print(f"\rLoading... {done}{rows:,} rows read", end='', flush=True)
 
 def main_menu():
     historical_df = None
+    historical_source, historical_mode = None, 'athlete'
+    resolver, by_region = None, False
     while True:
         print("\n=== Olympics Dashboard ===")
         print("1. View Live Medal Tally")
@@ -21,93 +63,260 @@ def main_menu():
         print("5. Plot Country Medal Trend")
         print("6. Predict Future Medals for a Country")
         print("7. Country Pie Chart (Historical)")
-        print("8. Compare Two Countries (Bar)")
-        print("9. Compare Two Countries (Radar)")
+        print("8. Compare Countries (Bar)")
+        print("9. Compare Countries (Radar)")
         print("10. Predict Multiple Countries (Shared Plot)")
-        print("11. Exit")
-        choice = input("Enter your choice (1-11): ").strip()
+        print("11. Forecast All Countries (Write Table)")
+        print("12. Compare Countries by Year")
+        print("13. Ingest New Games Results")
+        print("14. Exit")
+        choice = input("Enter your choice (1-14): ").strip()
 
         if choice == '1':
+            from live_data import fetch_medal_tally
             live_df = fetch_medal_tally()
             if live_df is not None:
                 print(live_df.to_string(index=False))
 
         elif choice == '2':
+            from live_data import fetch_event_schedule
             event_df = fetch_event_schedule()
             if event_df is not None:
                 print(event_df.to_string(index=False))
 
         elif choice == '3':
+            from historical_data import load_historical_data, MEDAL_MODES
             filepath = input("Enter path to historical dataset CSV: ").strip()
+            mode = input("Count medals per athlete or per nation? (athlete/nation) [athlete]: ").strip().lower() or 'athlete'
+            if mode not in MEDAL_MODES:
+                mode = 'athlete'
+                print("Invalid input. Counting athlete medals.")
+            by_region = input("Combine historic NOCs by region, e.g. URS and EUN under RUS? (y/n) [n]: ").strip().lower() == 'y'
             try:
-                historical_df = load_historical_data(filepath)
+                from medal_cube import as_medal_cube
+                from noc_resolver import NocResolver
+                try:
+                    historical_df = load_historical_data(filepath, mode=mode, progress=show_load_progress)
+                finally:
+                    print()
+                historical_source, historical_mode = filepath, mode
+                resolver = NocResolver.from_cube(as_medal_cube(historical_df), by_region=by_region)
+                if by_region:
+                    historical_df = roll_up_regions(historical_df, resolver)
+                install_completer(resolver)
                 print("Historical data loaded successfully.")
             except Exception as e:
                 print(f"Error loading data: {e}")
 
         elif choice == '4':
             if historical_df is not None:
-                plot_interactive_medals(historical_df)
+                from render_cache import render_figure
+                show_figure(render_figure('top10', historical_df))
             else:
                 print("Please load historical data first.")
 
         elif choice == '5':
             if historical_df is not None:
-                country_code = input("Enter country NOC code (e.g., USA, IND): ").strip().upper()
-                medal_counts = get_country_medal_counts(historical_df, country_code)
-                plot_country_medal_trend(medal_counts, country_code)
+                from render_cache import render_figure
+                country_code = read_country(resolver, "Enter country NOC code or name (e.g., USA, India): ")
+                if country_code:
+                    show_figure(render_figure('trend', historical_df, country_code))
             else:
                 print("Please load historical data first.")
 
         elif choice == '6':
             if historical_df is not None:
-                country_code = input("Enter country NOC code (e.g., USA, IND): ").strip().upper()
-                medal_counts = get_country_medal_counts(historical_df, country_code)
-                predict_future_medals(medal_counts, country_code)
+                from historical_data import get_country_medal_counts
+                from prediction import predict_future_medals
+                country_code = read_country(resolver, "Enter country NOC code or name (e.g., USA, India): ")
+                if country_code:
+                    medal_counts = get_country_medal_counts(historical_df, country_code)
+                    show_figure(predict_future_medals(medal_counts, country_code))
             else:
                 print("Please load historical data first.")
 
         elif choice == '7':
             if historical_df is not None:
-                country_code = input("Enter country NOC code (e.g., USA, IND): ").strip().upper()
-                plot_country_pie(historical_df, country_code)
+                from render_cache import render_figure
+                country_code = read_country(resolver, "Enter country NOC code or name (e.g., USA, India): ")
+                if country_code:
+                    show_figure(render_figure('pie', historical_df, country_code))
             else:
                 print("Please load historical data first.")
 
-        elif choice == '8':
+        elif choice in ('8', '9', '12'):
             if historical_df is not None:
-                c1 = input("Enter first country NOC code: ").strip().upper()
-                c2 = input("Enter second country NOC code: ").strip().upper()
-                compare_two_countries(historical_df, c1, c2)
-            else:
-                print("Please load historical data first.")
-
-        elif choice == '9':
-            if historical_df is not None:
-                c1 = input("Enter first country NOC code: ").strip().upper()
-                c2 = input("Enter second country NOC code: ").strip().upper()
-                radar_compare_countries(historical_df, c1, c2)
+                from render_cache import render_figure
+                codes = read_countries(resolver, "Enter comma-separated NOC codes or names (e.g., USA, IND, China): ")
+                kind = {'8': 'bar', '9': 'radar', '12': 'by_year'}[choice]
+                if codes:
+                    show_figure(render_figure(kind, historical_df, *codes))
             else:
                 print("Please load historical data first.")
 
         elif choice == '10':
             if historical_df is not None:
-                codes = input("Enter comma-separated NOC codes (e.g., USA, IND, CHN): ").strip().upper().split(',')
+                from forecasters import get_forecaster
+                from prediction import predict_multiple_countries_shared_plot
+                codes = read_countries(resolver, "Enter comma-separated NOC codes or names (e.g., USA, IND, China): ")
                 try:
                     degree = int(input("Enter polynomial degree (e.g., 2): ").strip())
                 except ValueError:
                     degree = 2
                     print("Invalid input. Using default degree = 2.")
-                predict_multiple_countries_shared_plot(historical_df, [c.strip() for c in codes], degree)
+                show_figure(predict_multiple_countries_shared_plot(historical_df, codes,
+                                                                   get_forecaster('polynomial', degree=degree)))
             else:
                 print("Please load historical data first.")
 
         elif choice == '11':
+            if historical_df is not None:
+                from forecast_engine import forecast_all_nocs
+                output_path = input("Enter output path for the forecast table [forecasts.csv]: ").strip() or 'forecasts.csv'
+                try:
+                    table = forecast_all_nocs(historical_df, output_path)
+                    print(f"Wrote forecasts for {len(table)} countries to {output_path}.")
+                except Exception as e:
+                    print(f"Error writing forecasts: {e}")
+            else:
+                print("Please load historical data first.")
+
+        elif choice == '13':
+            if historical_df is not None:
+                from ingest import ingest_delta, ingest_medal_tally
+                delta = input("Enter path to a results file for the new Games, or 'live' for the final live medal tally: ").strip()
+                try:
+                    if delta.lower() == 'live':
+                        from live_data import fetch_medal_tally
+                        tally = fetch_medal_tally(fresh=True)
+                        if tally is not None:
+                            year = int(input("Enter the year of these Games: ").strip())
+                            season = input("Summer or Winter Games? [Summer]: ").strip() or 'Summer'
+                            historical_df = ingest_medal_tally(historical_source, tally, year, season, historical_df)
+                    else:
+                        historical_df = ingest_delta(historical_source, delta, historical_df, historical_mode)
+                    if by_region:
+                        historical_df = roll_up_regions(historical_df, resolver)
+                except (OSError, ValueError) as e:
+                    print(f"Error ingesting results: {e}")
+            else:
+                print("Please load historical data first.")
+
+        elif choice == '14':
             print("Exiting the dashboard. Goodbye!")
             break
 
         else:
-            print("Invalid choice. Please enter a number between 1 and 11.")
+            print("Invalid choice. Please enter a number between 1 and 14.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Olympics Dashboard")
+    parser.add_argument('--batch', action='store_true',
+                        help="render reports to files without the interactive menu")
+    parser.add_argument('--data', help="path to the historical dataset CSV (batch mode)")
+    parser.add_argument('--nocs', default='all',
+                        help="comma-separated NOC codes, or 'all' (default: all)")
+    parser.add_argument('--reports', default='trend,pie,bar,radar,forecast',
+                        help="comma-separated report types: trend, pie, bar, radar, forecast")
+    parser.add_argument('--formats', default='html', help="comma-separated output formats: html, png, json")
+    parser.add_argument('--out', default='reports', help="output directory (default: reports)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--mode', default='athlete', choices=['athlete', 'nation'], help="medal counting mode")
+    parser.add_argument('--forecaster', default='polynomial', help="forecasting backend for forecast reports")
+    parser.add_argument('--baseline', default=None,
+                        help="NOC compared against every other NOC in bar/radar reports (default: first NOC)")
+    parser.add_argument('--backtest', action='store_true',
+                        help="replay history and report forecast accuracy per model, season and country")
+    parser.add_argument('--models', nargs='+', default=['wls', 'polynomial', 'holt'],
+                        help="backtest models, optionally with settings, e.g. holt:alpha=0.3,beta=0.1")
+    parser.add_argument('--cutoffs', type=int, default=20, help="number of most recent Games of each season to backtest from")
+    parser.add_argument('--publish', metavar='DIR',
+                        help="build the data from --data once and publish it to DIR for dashboard processes "
+                             "started with OLYMPIC_DATA_PLANE=DIR")
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help="with --publish, check the source every SECONDS and republish when it changes")
+    parser.add_argument('--trace', action='store_true',
+                        help="time each stage and print Prometheus-style metrics on exit "
+                             "(set OLYMPIC_TRACE_LOG=path for JSON-lines spans)")
+    return parser.parse_args(argv)
+
+def enable_tracing():
+    import atexit
+    import tracing
+
+    # Batch worker processes pick the setting up from the environment
+    os.environ['OLYMPIC_TRACE'] = '1'
+    tracing.enable()
+    atexit.register(lambda: sys.stderr.write(tracing.prometheus_text()))
+
+def run_batch_mode(args):
+    from batch_report import run_batch, REPORT_TYPES, FORMATS
+
+    if not args.data:
+        print("Batch mode needs --data PATH.")
+        return 2
+    reports = [r.strip() for r in args.reports.split(',') if r.strip()]
+    formats = [f.strip() for f in args.formats.split(',') if f.strip()]
+    unknown = [r for r in reports if r not in REPORT_TYPES] + [f for f in formats if f not in FORMATS]
+    if unknown:
+        print(f"Unknown report type or format: {', '.join(unknown)}")
+        return 2
+    codes = None if args.nocs.lower() == 'all' else [c.strip().upper() for c in args.nocs.split(',') if c.strip()]
+    run_batch(args.data, codes, reports, formats, args.out, max_workers=args.workers, mode=args.mode,
+              forecaster=args.forecaster, baseline=args.baseline)
+    return 0
+
+def run_backtest_mode(args):
+    from backtest import run_backtest, write_backtest
+    from historical_data import load_historical_data
+
+    if not args.data:
+        print("Backtest mode needs --data PATH.")
+        return 2
+    try:
+        historical_df = load_historical_data(args.data, mode=args.mode)
+        predictions, by_model, by_country = run_backtest(historical_df, args.models, args.cutoffs,
+                                                         max_workers=args.workers)
+    except (OSError, ValueError) as e:
+        print(f"Error running backtest: {e}")
+        return 2
+    print(by_model.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    for path in write_backtest(predictions, by_model, by_country, args.out):
+        print(f"Wrote {path}")
+    return 0
+
+def run_publish_mode(args):
+    import time
+    from data_plane import publish, source_state
+
+    if not args.data:
+        print("Publish mode needs --data PATH.")
+        return 2
+    published = None
+    while True:
+        state = source_state(args.data)
+        if state != published:
+            try:
+                start = time.perf_counter()
+                version = publish(args.data, args.publish)
+                published = state
+                print(f"Published version {version} to {args.publish} in {time.perf_counter() - start:.1f}s")
+            except (OSError, ValueError) as e:
+                print(f"Error publishing data: {e}")
+                if published is None:
+                    return 2
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.trace:
+        enable_tracing()
+    if args.batch:
+        sys.exit(run_batch_mode(args))
+    if args.backtest:
+        sys.exit(run_backtest_mode(args))
+    if args.publish:
+        sys.exit(run_publish_mode(args))
     main_menu()
@@ -0,0 +1,102 @@
+# map_figures.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import pandas as pd
+import plotly.express as px
+
+import tracing
+from noc_resolver import NOC_REGIONS_PATH, read_noc_regions
+
+MAX_FIGURES = 8
+
+HISTORICAL_COLOR_SCALE = [
+    [0.0, "rgb(211, 211, 211)"],
+    [0.2, "rgb(95, 15, 64)"],
+    [0.4, "rgb(5, 140, 66)"],
+    [0.6, "rgb(206, 212, 218)"],
+    [0.8, "rgb(0, 166, 251)"],
+    [1.0, "rgb(3, 4, 94)"]
+]
+
+LIVE_COLOR_SCALE = [
+    [0.0, "rgb(255, 255, 217)"],
+    [0.2, "rgb(237, 248, 177)"],
+    [0.4, "rgb(199, 233, 180)"],
+    [0.6, "rgb(127, 205, 187)"],
+    [0.8, "rgb(65, 182, 196)"],
+    [1.0, "rgb(34, 94, 168)"]
+]
+
+
+@lru_cache(maxsize=None)
+def load_noc_regions(path=NOC_REGIONS_PATH):
+    # NOC -> region name, for NOCs that have one
+    return {noc: region for noc, (region, _) in read_noc_regions(path).items() if region}
+
+
+def region_totals(cube):
+    # Historic NOCs that share a region (FRG/GDR/GER) are summed into one row
+    totals = cube.totals_frame()
+    totals['region'] = totals['NOC'].map(load_noc_regions())
+    totals = totals[totals['region'].notna()]
+    return totals.groupby('region', as_index=False)[['Gold', 'Silver', 'Bronze', 'Total']].sum()
+
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cached_figure(key, build):
+    # Figures are built once per data version. st.plotly_chart serializes
+    # the figure itself, so no JSON is kept alongside it.
+    with _lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+            tracing.count('map_figures.hit')
+            return fig
+    tracing.count('map_figures.miss')
+    with tracing.span('render.build.map'):
+        fig = build()
+    with _lock:
+        _figures[key] = fig
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+    return fig
+
+
+def historical_medal_map(cube):
+    def build():
+        return px.choropleth(
+            region_totals(cube),
+            locations="region",
+            locationmode="country names",
+            color="Total",
+            hover_name="region",
+            color_continuous_scale=HISTORICAL_COLOR_SCALE,
+            title="Total Historical Medals by Country"
+        )
+
+    return _cached_figure(('historical', cube.version), build)
+
+
+def live_medal_map(live_df):
+    # Keyed on the tally contents, so the figure is only rebuilt when medals change
+    fingerprint = hashlib.sha1(pd.util.hash_pandas_object(live_df, index=False).to_numpy().tobytes()).hexdigest()
+
+    def build():
+        return px.choropleth(
+            live_df,
+            locations="Country",
+            locationmode="country names",
+            color="Total",
+            hover_name="Country",
+            color_continuous_scale=LIVE_COLOR_SCALE,
+            title="Live Medal Tally by Country"
+        )
+
+    return _cached_figure(('live', fingerprint), build)
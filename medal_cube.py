@@ -0,0 +1,178 @@
+# medal_cube.py
+
+import hashlib
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import tracing
+
+MEDALS = ['Gold', 'Silver', 'Bronze']
+ALL_SEASONS = 'All'
+
+
+class MedalCube:
+    # Medal counts as a dense (NOC x Year x Season x Medal) array, with the
+    # per-country reductions the views need computed once up front.
+
+    def __init__(self, counts, nocs, years, seasons):
+        self.counts = counts
+        self.nocs = pd.Index(nocs, name='NOC')
+        self.years = pd.Index(years, name='Year')
+        self.seasons = pd.Index(seasons, name='Season')
+        self.noc_set = frozenset(self.nocs)
+
+        self.noc_year = counts.sum(axis=2)
+        self.noc_totals = self.noc_year.sum(axis=1)
+        self.ranking = np.argsort(-self.noc_totals.sum(axis=1), kind='stable')
+        self._series = {}
+        self._version = None
+
+    @property
+    def version(self):
+        # Content fingerprint, used to key caches derived from the cube
+        if self._version is None:
+            digest = hashlib.sha1(self.counts.tobytes())
+            for labels in (self.nocs, self.years, self.seasons):
+                digest.update('|'.join(map(str, labels)).encode('utf-8'))
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    @property
+    def empty(self):
+        return not self.noc_totals.any()
+
+    @classmethod
+    @tracing.traced('aggregate.cube')
+    def from_frame(cls, df):
+        # Accepts athlete rows with a 'Medal' column or pre-aggregated rows
+        # with Gold/Silver/Bronze count columns.
+        if all(m in df.columns for m in MEDALS):
+            df = df[['NOC', 'Year'] + (['Season'] if 'Season' in df.columns else []) + MEDALS]
+            weights = [df[m].to_numpy(dtype=np.int64) for m in MEDALS]
+        else:
+            df = df[df['Medal'].notna()]
+            medal = df['Medal'].to_numpy(dtype=object)
+            weights = [(medal == m).astype(np.int64) for m in MEDALS]
+
+        noc_codes, nocs = pd.factorize(df['NOC'], sort=True)
+        year_codes, years = pd.factorize(df['Year'], sort=True)
+        if 'Season' in df.columns:
+            season_codes, seasons = pd.factorize(df['Season'], sort=True)
+        else:
+            season_codes, seasons = np.zeros(len(df), dtype=np.int64), [ALL_SEASONS]
+
+        shape = (len(nocs), len(years), len(seasons), len(MEDALS))
+        cell = (noc_codes * shape[1] + year_codes) * shape[2] + season_codes
+        size = shape[0] * shape[1] * shape[2]
+        counts = np.stack(
+            [np.bincount(cell, weights=w, minlength=size) for w in weights], axis=-1
+        ).astype(np.int64).reshape(shape)
+        return cls(counts, np.asarray(nocs), np.asarray(years), np.asarray(seasons))
+
+    @tracing.traced('aggregate.cube_merge')
+    def merge(self, df):
+        # New cube with the medals in df added. Only the cells df touches
+        # are written, and cached country series are kept for every
+        # country df does not mention.
+        delta = MedalCube.from_frame(df)
+        nocs = self.nocs.union(delta.nocs)
+        years = self.years.union(delta.years)
+        seasons = self.seasons.union(delta.seasons)
+        if len(nocs) == len(self.nocs) and len(years) == len(self.years) and len(seasons) == len(self.seasons):
+            counts = self.counts.copy()
+        else:
+            counts = np.zeros((len(nocs), len(years), len(seasons), len(MEDALS)), dtype=np.int64)
+            counts[np.ix_(nocs.get_indexer(self.nocs), years.get_indexer(self.years),
+                          seasons.get_indexer(self.seasons))] = self.counts
+        counts[np.ix_(nocs.get_indexer(delta.nocs), years.get_indexer(delta.years),
+                      seasons.get_indexer(delta.seasons))] += delta.counts
+
+        merged = MedalCube(counts, np.asarray(nocs), np.asarray(years), np.asarray(seasons))
+        merged._series = {code: s for code, s in self._series.items() if code not in delta.noc_set}
+        return merged
+
+    def has_country(self, country_code):
+        return country_code in self.noc_set
+
+    def country_totals(self, country_code):
+        i = self.nocs.get_loc(country_code)
+        return pd.Series(self.noc_totals[i], index=MEDALS)
+
+    def country_by_year(self, country_code):
+        cached = self._series.get(country_code)
+        if cached is not None:
+            return cached.copy()
+        if not self.has_country(country_code):
+            return pd.DataFrame(columns=['Year'] + MEDALS + ['Total'])
+
+        rows = self.noc_year[self.nocs.get_loc(country_code)]
+        totals = rows.sum(axis=1)
+        active = totals > 0
+        medal_counts = pd.DataFrame(rows[active], columns=MEDALS)
+        medal_counts.insert(0, 'Year', self.years[active])
+        medal_counts['Total'] = totals[active]
+        self._series[country_code] = medal_counts
+        return medal_counts.copy()
+
+    def totals_frame(self, country_codes=None):
+        if country_codes is None:
+            idx = np.arange(len(self.nocs))
+        else:
+            idx = self.nocs.get_indexer(country_codes)
+            idx = idx[idx >= 0]
+        data = pd.DataFrame(self.noc_totals[idx], columns=MEDALS)
+        data.insert(0, 'NOC', self.nocs[idx])
+        data['Total'] = data[MEDALS].sum(axis=1)
+        return data
+
+    def resolve(self, country_codes):
+        # Splits requested codes into known and unknown, dropping repeats
+        codes = list(dict.fromkeys(country_codes))
+        known = [code for code in codes if code in self.noc_set]
+        unknown = [code for code in codes if code not in self.noc_set]
+        return known, unknown
+
+    def countries_by_year(self, country_codes):
+        # Long-form Year x NOC counts for several countries in one slice,
+        # restricted to years in which any of them won a medal
+        idx = self.nocs.get_indexer(country_codes)
+        idx = idx[idx >= 0]
+        rows = self.noc_year[idx]
+        active = rows.sum(axis=(0, 2)) > 0
+        rows = rows[:, active]
+        n_countries, n_years = rows.shape[:2]
+        data = pd.DataFrame(rows.reshape(-1, len(MEDALS)), columns=MEDALS)
+        data.insert(0, 'Year', np.tile(self.years[active], n_countries))
+        data.insert(0, 'NOC', np.repeat(self.nocs[idx], n_years))
+        data['Total'] = rows.sum(axis=2).ravel()
+        return data
+
+    def top_n(self, n=10):
+        # Ranked by total medals, ties broken by golds then silvers, the same
+        # order as the 'total' ranking tables
+        from ranking import top_n
+        return self.totals_frame(self.nocs[top_n(self.noc_totals, n, 'total')])
+
+
+_cubes = {}
+
+
+def register_cube(data, cube):
+    # Associates an already built cube with a medal frame
+    key = id(data)
+    _cubes[key] = cube
+    weakref.finalize(data, _cubes.pop, key, None)
+    return cube
+
+
+def as_medal_cube(data):
+    # Views accept either a cube or a medal frame; frames are aggregated once
+    # and the cube is reused for as long as the frame object is alive.
+    if isinstance(data, MedalCube):
+        return data
+    cube = _cubes.get(id(data))
+    if cube is None:
+        cube = register_cube(data, MedalCube.from_frame(data))
+    return cube
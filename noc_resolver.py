@@ -0,0 +1,182 @@
+# noc_resolver.py
+
+import bisect
+import csv
+import difflib
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+NOC_REGIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'noc_regions.csv')
+
+# Common names the regions file does not use
+ALIASES = {
+    'united states': 'USA',
+    'united states of america': 'USA',
+    'america': 'USA',
+    'great britain': 'GBR',
+    'united kingdom': 'GBR',
+    'britain': 'GBR',
+    'soviet union': 'URS',
+    'ussr': 'URS',
+    'unified team': 'EUN',
+    'west germany': 'FRG',
+    'east germany': 'GDR',
+    'czechoslovakia': 'TCH',
+    'holland': 'NED',
+    'chinese taipei': 'TPE',
+    'korea': 'KOR',
+    'republic of korea': 'KOR',
+}
+
+# Codes used elsewhere for a NOC the dataset knows under another code
+CODE_ALIASES = {
+    'SGP': 'SIN',
+}
+
+
+@lru_cache(maxsize=None)
+def read_noc_regions(path=NOC_REGIONS_PATH):
+    # NOC -> (region, notes), either of which may be None. The file uses
+    # bare CR line endings, which splitlines() handles alongside LF and CRLF.
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f.read().splitlines()))
+    header = rows[0]
+    noc_col, region_col, notes_col = header.index('NOC'), header.index('region'), header.index('notes')
+
+    def value(row, col):
+        text = row[col].strip() if len(row) > col else ''
+        return text if text not in ('', 'NA') else None
+
+    return {row[noc_col].strip(): (value(row, region_col), value(row, notes_col)) for row in rows[1:] if row}
+
+
+def last_active_years(cube):
+    # NOC -> last year in which it won a medal (0 if never)
+    active = cube.noc_year.sum(axis=2) > 0
+    last = len(cube.years) - 1 - np.argmax(active[:, ::-1], axis=1)
+    years = np.where(active.any(axis=1), np.asarray(cube.years)[last], 0)
+    return dict(zip(cube.nocs, years.tolist()))
+
+
+class NocResolver:
+    # Country input -> NOC code. Codes, region names, notes and aliases are
+    # kept lowercase in one sorted list, so autocomplete and validation are a
+    # binary search plus a scan over the matches. Names shared by several
+    # NOCs (Germany: GER, FRG, GDR) resolve to the one that competed most
+    # recently.
+
+    def __init__(self, regions, last_active=None, codes=None, by_region=False):
+        # regions: NOC -> (region, notes); last_active: NOC -> last year with
+        # medals; codes: the NOCs to accept (default: those in last_active,
+        # else every NOC in regions). With by_region, every input resolves
+        # to its region's current code, matching data rolled up by roll_up().
+        self.by_region = by_region
+        self.last_active = dict(last_active or {})
+        if codes is None:
+            codes = self.last_active or regions
+        self.codes = sorted(codes)
+        self.code_set = frozenset(self.codes)
+        self.regions = {}
+        for code in self.codes:
+            region, notes = regions.get(code, (None, None))
+            self.regions[code] = region or notes or code
+
+        entries = set()
+        for code in self.codes:
+            entries.add((code.lower(), code))
+            for name in regions.get(code, ()):
+                if name:
+                    entries.add((name.lower(), code))
+        for name, code in ALIASES.items():
+            if code in self.code_set:
+                entries.add((name, code))
+        # Most recent NOC first among those sharing a name
+        ordered = sorted(entries, key=lambda e: (e[0], -self.last_active.get(e[1], 0), e[1]))
+        self._keys = [key for key, _ in ordered]
+        self._entries = [code for _, code in ordered]
+
+        # Every region is represented by its most recently active NOC
+        self._region_codes = {}
+        for code in sorted(self.codes, key=lambda c: (-self.last_active.get(c, 0), c)):
+            self._region_codes.setdefault(self.regions[code], code)
+
+    @classmethod
+    def from_cube(cls, cube, path=NOC_REGIONS_PATH, by_region=False):
+        # Restricted to the NOCs in the cube
+        return cls(read_noc_regions(path), last_active_years(cube), by_region=by_region)
+
+    def _matches(self, prefix):
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + '\uffff', lo=start)
+        return start, end
+
+    def complete(self, prefix, limit=10):
+        # NOC codes whose code or any name starts with prefix
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        start, end = self._matches(prefix)
+        found = []
+        for code in self._entries[start:end]:
+            if self.by_region:
+                code = self.region_code(code)
+            if code not in found:
+                found.append(code)
+                if len(found) == limit:
+                    break
+        return found
+
+    def resolve(self, text):
+        # A NOC code, country name or alias -> NOC code, or None
+        text = str(text).strip()
+        code = CODE_ALIASES.get(text.upper(), text.upper())
+        if code not in self.code_set:
+            start, end = self._matches(text.lower())
+            if start == end or self._keys[start] != text.lower():
+                return None
+            code = self._entries[start]
+        return self.region_code(code) if self.by_region else code
+
+    def resolve_many(self, texts):
+        # (codes, unknown inputs), each in input order without repeats
+        codes, unknown = [], []
+        for text in texts:
+            if not str(text).strip():
+                continue
+            code = self.resolve(text)
+            if code is None:
+                unknown.append(str(text).strip())
+            elif code not in codes:
+                codes.append(code)
+        return codes, unknown
+
+    def suggest(self, text, limit=3):
+        # Close matches for an input that did not resolve
+        found = self.complete(text, limit)
+        if found:
+            return found
+        close = difflib.get_close_matches(str(text).strip().lower(), self._keys, n=limit, cutoff=0.6)
+        codes = (self._entries[self._keys.index(key)] for key in close)
+        return list(dict.fromkeys(self.region_code(c) if self.by_region else c for c in codes))
+
+    def label(self, code):
+        region = self.regions.get(code)
+        return f"{code} ({region})" if region and region != code else code
+
+    def region_code(self, code):
+        # The current NOC of a code's region: URS -> RUS, FRG -> GER
+        return self._region_codes.get(self.regions.get(code, code), code)
+
+    def roll_up(self, df):
+        # Medal rows with every historic NOC counted under its region's
+        # current code. One remap of the NOC category codes, so the cost
+        # does not depend on how many NOCs are merged.
+        noc = df['NOC'].astype('category')
+        targets = pd.Index([self.region_code(code) for code in noc.cat.categories])
+        merged = pd.Index(targets.unique()).sort_values()
+        lookup = np.append(merged.get_indexer(targets), -1)
+        codes = lookup[noc.cat.codes.to_numpy()]
+        return df.assign(NOC=pd.Categorical.from_codes(codes, merged))
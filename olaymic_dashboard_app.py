@@ -1,28 +1,13 @@
+import os
+import time
+
 import streamlit as st
-import pandas as pd
-from live_data import fetch_medal_tally, fetch_event_schedule
-from historical_data import load_historical_data, get_country_medal_counts
-from visualization import (
-    plot_interactive_medals,
-    plot_country_medal_trend,
-    plot_country_pie,
-    compare_two_countries,
-    radar_compare_countries
-)
-from prediction import predict_future_medals, predict_multiple_countries_shared_plot
-from data_loader import load_athlete_data
-
-df = load_athlete_data()
-
-# Convert 'Medal' column into 'Gold', 'Silver', 'Bronze' if necessary
-if 'Gold' not in df.columns or 'Silver' not in df.columns or 'Bronze' not in df.columns:
-    df = df[df['Medal'].notna()]
-    medal_counts = df.groupby(['Year', 'NOC', 'Medal']).size().unstack(fill_value=0)
-    for medal in ['Gold', 'Silver', 'Bronze']:
-        if medal not in medal_counts.columns:
-            medal_counts[medal] = 0
-    medal_counts = medal_counts.reset_index()
-    df = medal_counts
+
+import tracing
+
+# Data, pandas, plotly and the live client are imported inside the cached
+# loaders and the views that use them, so the page paints before any of
+# them load.
 
 # Page config
 st.set_page_config(page_title="Olympics Dashboard", layout="wide", page_icon="🏆")
@@ -46,14 +31,85 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Load default historical data
-@st.cache_data
-def load_default_historical_data():
-    return df
+# Load default historical data, pivoted to medal counts per Games and NOC.
+# Held once per process and shared by all sessions without copying.
+@st.cache_resource
+def load_default_historical_data(mode='athlete'):
+    from data_cache import read_medal_tallies
+    from data_loader import ATHLETE_DATA_URL, load_athlete_data
+    from forecast_cache import forecast_cache
+    from historical_data import add_medal_tallies, pivot_medal_table
+
+    df = load_athlete_data()
+    if df is None:
+        return None
+    forecast_cache.set_data_version(df.attrs.get('source_key'))
+    return add_medal_tallies(pivot_medal_table(df, mode), read_medal_tallies(ATHLETE_DATA_URL))
+
+# Medal aggregates shared by every session of this process
+@st.cache_resource
+def load_medal_cube(mode='athlete', by_region=False):
+    from medal_cube import MedalCube
+
+    df = load_default_historical_data(mode)
+    if df is None:
+        return None
+    if by_region:
+        df = load_resolver(by_region=True).roll_up(df)
+    return MedalCube.from_frame(df)
+
+# Country names, aliases and prefix search over the dataset's NOCs
+@st.cache_resource
+def load_resolver(by_region=False):
+    from noc_resolver import NocResolver
+
+    cube = load_medal_cube()
+    if cube is None:
+        return None
+    return NocResolver.from_cube(cube, by_region=by_region)
+
+# Ranking tables for every Games and scheme, computed once per process
+@st.cache_resource
+def load_rankings(mode='athlete', by_region=False):
+    from ranking import Rankings, read_populations
+
+    cube = load_medal_cube(mode, by_region)
+    if cube is None:
+        return None
+    return Rankings.from_cube(cube, read_populations())
+
+@st.cache_resource
+def load_sport_rankings(mode='athlete'):
+    from data_loader import load_athlete_index
+    from ranking import Rankings, read_populations
+
+    index = load_athlete_index()
+    if index is None:
+        return None
+    return Rankings.from_index(index, mode, read_populations())
+
+# Serving mode: with OLYMPIC_DATA_PLANE set, a loader process
+# (python main.py --publish DIR --data SOURCE) builds the data once and
+# every dashboard process maps it read-only; see data_plane.py
+@st.cache_resource
+def get_data_plane_client():
+    from data_plane import DataPlaneClient
+    from forecast_cache import forecast_cache
+
+    return DataPlaneClient(os.environ['OLYMPIC_DATA_PLANE'],
+                           on_swap=lambda plane: forecast_cache.set_data_version(plane.source_key))
 
-# Initialize historical data if not already loaded
-if 'historical_df' not in st.session_state:
-    st.session_state['historical_df'] = load_default_historical_data()
+# One background poller per process feeds the live views of every session
+@st.cache_resource
+def get_live_poller():
+    from live_poller import LivePoller
+
+    poller = LivePoller()
+    poller.start()
+    return poller
+
+def live_snapshot():
+    return get_live_poller().wait_for_snapshot(timeout=10)
 
 # Display Logo
 st.title("🏆 Olympics Dashboard")
@@ -69,71 +125,168 @@ menu = st.sidebar.radio("Navigation", [
     "Country Medal Trend",
     "Predict Future Medals",
     "Country Pie Chart",
-    "Compare Two Countries (Bar)",
-    "Compare Two Countries (Radar)",
-    "Predict Multiple Countries"
+    "Compare Countries",
+    "Predict Multiple Countries",
+    "Top Athletes",
+    "Country Strength by Sport",
+    "Event History",
+    "Medal Rankings"
 ])
 
+# Team events count once per nation in 'Nation medals' mode
+medal_label = st.sidebar.radio("Medal Counting", ["Athlete medals", "Nation medals"])
+medal_mode = 'nation' if medal_label == "Nation medals" else 'athlete'
+by_region = st.sidebar.checkbox("Combine historic NOCs by region", help="e.g. URS and EUN under RUS, FRG and GDR under GER")
+
+# Opt-in stage timings for this rerun. Only this rerun's thread is traced;
+# tracing stays off for every other session. A rerun interrupted before
+# its panel was drawn leaves its recording behind, so it is cleared first.
+tracing.stop_recording()
+debug = st.sidebar.checkbox("Show stage timings")
+if debug:
+    tracing.start_recording()
+rerun_start = time.perf_counter()
+
+# The published data version this rerun reads, if serving from a data plane
+plane = get_data_plane_client().current() if os.environ.get('OLYMPIC_DATA_PLANE') else None
+
+# Historical data is loaded the first time a view needs it
+def get_medal_cube():
+    if plane is not None:
+        return plane.cube(medal_mode, by_region)
+    return load_medal_cube(medal_mode, by_region)
+
+def get_resolver():
+    if plane is not None:
+        return plane.resolver(by_region)
+    return load_resolver(by_region)
+
+def get_athlete_index():
+    from data_loader import load_athlete_index
+
+    if plane is not None:
+        return plane.athlete_index()
+    return load_athlete_index()
+
+def get_rankings(by_sport=False):
+    if plane is not None:
+        return plane.sport_rankings(medal_mode) if by_sport else plane.rankings(medal_mode, by_region)
+    return load_sport_rankings(medal_mode) if by_sport else load_rankings(medal_mode, by_region)
+
+def select_countries(cube, label, default=2):
+    # Countries ranked by medals; typing filters by code or country name
+    resolver = get_resolver()
+    ranked = list(cube.nocs[cube.ranking])
+    return st.multiselect(label, ranked, default=ranked[:default], format_func=resolver.label)
+
+def select_country(cube, label):
+    resolver = get_resolver()
+    return st.selectbox(label, list(cube.nocs[cube.ranking]), format_func=resolver.label)
+
+def select_forecaster():
+    from forecasters import FORECASTERS, get_forecaster
+
+    name = st.selectbox("Forecasting Model", list(FORECASTERS), format_func=lambda n: FORECASTERS[n].label)
+    return get_forecaster(name)
+
+def plot(fig, target=st):
+    with tracing.span('render.plotly_chart'):
+        target.plotly_chart(fig, use_container_width=True)
+
+def show_figure(fig, code):
+    if fig is not None:
+        plot(fig)
+    else:
+        st.warning(f"No data available for {code}.")
+
+COUNTDOWN_HTML = """
+<div id="countdown" style="font-family: sans-serif; font-size: 2rem; font-weight: 600; color: #e5c07b;"></div>
+<script>
+    const target = TARGET_MS;
+    const pad = (n) => String(n).padStart(2, '0');
+    function tick() {
+        const left = target - Date.now();
+        const el = document.getElementById('countdown');
+        if (left <= 0) {
+            el.textContent = '🟢 Event is Live!';
+            return;
+        }
+        const s = Math.floor(left / 1000);
+        const days = Math.floor(s / 86400);
+        const clock = Math.floor((s % 86400) / 3600) + ':' + pad(Math.floor((s % 3600) / 60)) + ':' + pad(s % 60);
+        el.textContent = '⏱ Time Remaining: ' + (days ? days + (days === 1 ? ' day, ' : ' days, ') : '') + clock;
+        setTimeout(tick, left % 1000 || 1000);
+    }
+    tick();
+</script>
+"""
+
 # Views
-import time
-import plotly.express as px
 from datetime import datetime, timedelta
 from dateutil import tz
 
 if menu == "Live Medal Tally":
     st.subheader("📊 Live Medal Tally")
-    live_df = fetch_medal_tally()
+    snapshot = live_snapshot()
+    live_df = snapshot.medal_tally
     if live_df is not None:
+        st.caption(f"Updated {datetime.fromtimestamp(snapshot.fetched_at):%H:%M:%S}")
         st.dataframe(live_df, use_container_width=True)
+        changed = snapshot.changes.get('medal_tally')
+        if changed is not None and not changed.empty and snapshot.version > 1:
+            st.write("### Changes Since Last Update")
+            st.dataframe(changed, use_container_width=True)
 
 elif menu == "Event Schedule":
     st.subheader("📅 Event Schedule")
-    event_df = fetch_event_schedule()
+    schedule = live_snapshot().schedule
+
+    if schedule is not None and len(schedule):
+        col1, col2 = st.columns(2)
+        discipline = col1.selectbox("Discipline", ["All"] + schedule.disciplines)
+        venue = col2.selectbox("Venue", ["All"] + schedule.venues)
+        if discipline != "All":
+            event_df = schedule.by_discipline(discipline)
+        elif venue != "All":
+            event_df = schedule.by_venue(venue)
+        else:
+            event_df = schedule.events
+        if discipline != "All" and venue != "All":
+            event_df = event_df[event_df['Venue'] == venue]
 
-    if event_df is not None and not event_df.empty:
-        event_df['Date'] = pd.to_datetime(event_df['Date'], errors='coerce')
-        event_df['Start Time'] = pd.to_datetime(event_df['Start Time'], errors='coerce', utc=True)
-        event_df['End Time'] = pd.to_datetime(event_df['End Time'], errors='coerce', utc=True)
+        # Times are stored in UTC and converted for display only
+        event_df = event_df.copy()
         local_zone = tz.tzlocal()
         event_df['Start Time'] = event_df['Start Time'].dt.tz_convert(local_zone)
         event_df['End Time'] = event_df['End Time'].dt.tz_convert(local_zone)
-        event_df = event_df.sort_values("Start Time")
         st.dataframe(event_df[['Date', 'Discipline', 'Event', 'Venue', 'Start Time', 'End Time']], use_container_width=True)
     else:
         st.warning("No upcoming event schedule available.")
 
 elif menu == "Countdown to Next Event":
     st.subheader("⏳ Countdown to Next Olympic Event")
-    event_df = fetch_event_schedule()
-    if event_df is not None and not event_df.empty:
-        event_df['Start Time'] = pd.to_datetime(event_df['Start Time'], utc=True).dt.tz_convert(tz.tzlocal())
-        now = datetime.now(tz.tzlocal())
-        future_events = event_df[event_df['Start Time'] > now].sort_values('Start Time')
-        if not future_events.empty:
-            next_event = future_events.iloc[0]
-            countdown_target = next_event['Start Time']
+    import streamlit.components.v1 as components
+    schedule = live_snapshot().schedule
+    if schedule is not None and len(schedule):
+        next_event = schedule.next_event()
+        if next_event is not None:
+            countdown_target = next_event['Start Time'].tz_convert(tz.tzlocal())
             st.markdown(f"**Next Event:** {next_event['Event']} ({next_event['Discipline']})")
             st.markdown(f"**Venue:** {next_event['Venue']}")
             st.markdown(f"**Start Time:** {countdown_target.strftime('%Y-%m-%d %H:%M:%S')}")
-            countdown_placeholder = st.empty()
-            while True:
-                time_left = countdown_target - datetime.now()
-                if time_left.total_seconds() <= 0:
-                    countdown_placeholder.markdown("## 🟢 Event is Live!")
-                    break
-                countdown_str = str(time_left).split('.')[0]
-                countdown_placeholder.markdown(f"## ⏱ Time Remaining: {countdown_str}")
-                time.sleep(1)
+            # The countdown ticks in the browser; no server thread is held
+            components.html(
+                COUNTDOWN_HTML.replace('TARGET_MS', str(int(countdown_target.timestamp() * 1000))),
+                height=70
+            )
         else:
             st.info("No upcoming events found.")
 
 elif menu == "Event Highlights":
     st.subheader("🎯 Event Highlights")
-    event_df = fetch_event_schedule()
-    if event_df is not None:
-        event_df['Date'] = pd.to_datetime(event_df['Date'])
-        today = datetime.now().date()
-        recent_events = event_df[event_df['Date'].dt.date == today]
+    schedule = live_snapshot().schedule
+    if schedule is not None:
+        recent_events = schedule.on_day(tz.tzlocal())
         if not recent_events.empty:
             st.write("### Today's Events:")
             st.dataframe(recent_events, use_container_width=True)
@@ -142,103 +295,169 @@ elif menu == "Event Highlights":
 
 elif menu == "World Medal Map":
     st.subheader("🌍 World Medal Map")
+    from map_figures import historical_medal_map, live_medal_map
+    snapshot = live_snapshot()
     medal_type = st.radio("Choose Medal Data Source", ["Historical", "Live"], horizontal=True)
     if medal_type == "Historical":
-        df = st.session_state['historical_df']
-        if df is not None:
-            country_totals = df.groupby('NOC')[['Gold', 'Silver', 'Bronze']].sum()
-            country_totals['Total'] = country_totals.sum(axis=1)
-            country_totals = country_totals.reset_index()
-            noc_map = pd.read_csv("data/noc_regions.csv")
-            merged = pd.merge(country_totals, noc_map, on="NOC", how="left")
-            color_scale = [
-                [0.0, "rgb(211, 211, 211)"],
-                [0.2, "rgb(95, 15, 64)"],
-                [0.4, "rgb(5, 140, 66)"],
-                [0.6, "rgb(206, 212, 218)"],
-                [0.8, "rgb(0, 166, 251)"],
-                [1.0, "rgb(3, 4, 94)"]
-            ]
-            fig = px.choropleth(
-                merged,
-                locations="region",
-                locationmode="country names",
-                color="Total",
-                hover_name="region",
-                color_continuous_scale=color_scale,
-                title="Total Historical Medals by Country"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        cube = get_medal_cube()
+        if cube is not None:
+            plot(historical_medal_map(cube))
     else:
-        live_df = fetch_medal_tally()
+        live_df = snapshot.medal_tally
         if live_df is not None:
-            color_scale = [
-                [0.0, "rgb(255, 255, 217)"],
-                [0.2, "rgb(237, 248, 177)"],
-                [0.4, "rgb(199, 233, 180)"],
-                [0.6, "rgb(127, 205, 187)"],
-                [0.8, "rgb(65, 182, 196)"],
-                [1.0, "rgb(34, 94, 168)"]
-            ]
-            fig = px.choropleth(
-                live_df,
-                locations="Country",
-                locationmode="country names",
-                color="Total",
-                hover_name="Country",
-                color_continuous_scale=color_scale,
-                title="Live Medal Tally by Country"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            plot(live_medal_map(live_df))
     st.subheader("📅 Event Schedule")
-    event_df = fetch_event_schedule()
+    event_df = snapshot.event_schedule
     if event_df is not None:
         st.dataframe(event_df, use_container_width=True)
 
 elif menu == "Top 10 Countries":
     st.subheader("🏆 Top 10 Countries (Historical)")
-    if st.session_state['historical_df'] is not None:
-        plot_interactive_medals(st.session_state['historical_df'])
+    from render_cache import render_figure
+    cube = get_medal_cube()
+    if cube is not None:
+        plot(render_figure('top10', cube))
     else:
         st.warning("Historical data not loaded.")
 
 elif menu == "Country Medal Trend":
     st.subheader("📈 Medal Trend by Country")
-    code = st.text_input("Enter Country NOC Code (e.g., USA, IND):").upper()
-    if code and st.session_state['historical_df'] is not None:
-        data = get_country_medal_counts(st.session_state['historical_df'], code)
-        plot_country_medal_trend(data, code)
+    from render_cache import render_figure
+    cube = get_medal_cube()
+    if cube is not None:
+        code = select_country(cube, "Country:")
+        show_figure(render_figure('trend', cube, code), code)
 
 elif menu == "Predict Future Medals":
     st.subheader("🔮 Predict Future Medals")
-    code = st.text_input("Enter Country NOC Code:").upper()
-    if code and st.session_state['historical_df'] is not None:
-        data = get_country_medal_counts(st.session_state['historical_df'], code)
-        predict_future_medals(data, code)
+    from render_cache import render_figure
+    cube = get_medal_cube()
+    if cube is not None:
+        code = select_country(cube, "Country:")
+        forecaster = select_forecaster()
+        show_figure(render_figure('forecast', cube, code, forecaster), code)
 
 elif menu == "Country Pie Chart":
     st.subheader("🥇 Medal Distribution Pie Chart")
-    code = st.text_input("Enter Country NOC Code:").upper()
-    if code and st.session_state['historical_df'] is not None:
-        plot_country_pie(st.session_state['historical_df'], code)
-
-elif menu == "Compare Two Countries (Bar)":
-    st.subheader("🇨🇳🇺🇸 Compare Countries - Bar Chart")
-    c1 = st.text_input("Country 1 NOC Code:").upper()
-    c2 = st.text_input("Country 2 NOC Code:").upper()
-    if c1 and c2 and st.session_state['historical_df'] is not None:
-        compare_two_countries(st.session_state['historical_df'], c1, c2)
-
-elif menu == "Compare Two Countries (Radar)":
-    st.subheader("📡 Compare Countries - Radar Chart")
-    c1 = st.text_input("Country 1 NOC Code:").upper()
-    c2 = st.text_input("Country 2 NOC Code:").upper()
-    if c1 and c2 and st.session_state['historical_df'] is not None:
-        radar_compare_countries(st.session_state['historical_df'], c1, c2)
+    from render_cache import render_figure
+    cube = get_medal_cube()
+    if cube is not None:
+        code = select_country(cube, "Country:")
+        show_figure(render_figure('pie', cube, code), code)
+
+elif menu == "Compare Countries":
+    st.subheader("🇨🇳🇺🇸 Compare Countries")
+    from render_cache import render_figure
+    cube = get_medal_cube()
+    if cube is not None:
+        codes = select_countries(cube, "Countries:")
+        chart = st.radio("Chart", ["Bar", "Radar", "By Year"], horizontal=True)
+        kind = {"Bar": 'bar', "Radar": 'radar', "By Year": 'by_year'}[chart]
+        if codes:
+            show_figure(render_figure(kind, cube, *codes), ', '.join(codes))
+    else:
+        st.warning("Historical data not loaded.")
 
 elif menu == "Predict Multiple Countries":
     st.subheader("📊 Predict Multiple Countries")
-    codes = st.text_input("Enter comma-separated NOC codes (e.g., USA, IND, CHN):")
-    if codes and st.session_state['historical_df'] is not None:
-        country_list = [c.strip().upper() for c in codes.split(',') if c.strip()]
-        predict_multiple_countries_shared_plot(st.session_state['historical_df'], country_list)
+    from prediction import predict_multiple_countries_shared_plot
+    cube = get_medal_cube()
+    if cube is not None:
+        country_list = select_countries(cube, "Countries:", default=3)
+        forecaster = select_forecaster()
+        if country_list:
+            chart = st.empty()
+            predict_multiple_countries_shared_plot(
+                cube, country_list, forecaster,
+                on_update=lambda fig: plot(fig, chart)
+            )
+
+elif menu == "Top Athletes":
+    st.subheader("🏅 Top Athletes")
+    from visualization import plot_top_athletes
+    index = get_athlete_index()
+    if index is not None:
+        col1, col2, col3 = st.columns(3)
+        sport = col1.selectbox("Sport", ["All"] + list(index.sports))
+        games = col2.selectbox("Games", ["All"] + list(index.games_names[::-1]))
+        count = col3.slider("Athletes", 5, 50, 10)
+        top = index.top_athletes(count, None if sport == "All" else sport,
+                                 games=None if games == "All" else games)
+        if top.empty:
+            st.info("No medals found for this selection.")
+        else:
+            plot(plot_top_athletes(top))
+            names = dict(zip(top['ID'], top['Name']))
+            athlete = st.selectbox("Athlete Results", list(names), format_func=lambda i: f"{names[i]} ({i})")
+            st.dataframe(index.athlete_results(athlete), use_container_width=True, hide_index=True)
+    else:
+        st.warning("Athlete data not loaded.")
+
+elif menu == "Country Strength by Sport":
+    st.subheader("💪 Country Strength by Sport")
+    from visualization import plot_sport_strength
+    index = get_athlete_index()
+    if index is not None:
+        sport = st.selectbox("Sport", list(index.sports))
+        strength = index.country_strength(sport, medal_mode)
+        show_figure(plot_sport_strength(strength, sport), sport)
+        table = strength.assign(Share=(strength['Share'] * 100).round(1)).rename(columns={'Share': 'Share (%)'})
+        st.dataframe(table, use_container_width=True, hide_index=True)
+    else:
+        st.warning("Athlete data not loaded.")
+
+elif menu == "Event History":
+    st.subheader("📜 Event History")
+    from visualization import plot_event_history
+    index = get_athlete_index()
+    if index is not None:
+        col1, col2 = st.columns(2)
+        sport = col1.selectbox("Sport", list(index.sports))
+        event = col2.selectbox("Event", index.events(sport))
+        history = index.event_history(sport, event, medal_mode)
+        show_figure(plot_event_history(history, event), event)
+        st.dataframe(history, use_container_width=True, hide_index=True)
+    else:
+        st.warning("Athlete data not loaded.")
+
+elif menu == "Medal Rankings":
+    st.subheader("🥇 Medal Rankings")
+    from ranking import SCHEMES
+    from visualization import plot_ranking
+    col1, col2 = st.columns(2)
+    by_sport = col1.radio("Rank", ["Per Games", "Per Sport"], horizontal=True) == "Per Sport"
+    method = col2.radio("Ties", ["Competition (1-2-2-4)", "Dense (1-2-2-3)"], horizontal=True)
+    rankings = get_rankings(by_sport)
+    if rankings is not None:
+        col1, col2, col3 = st.columns(3)
+        group = col1.selectbox("Sport" if by_sport else "Games", rankings.groups)
+        scheme = col2.selectbox("Scheme", rankings.schemes, format_func=lambda s: SCHEMES[s][0])
+        count = col3.slider("Countries", 5, 50, 10)
+        table = rankings.table(group, scheme, 'dense' if method.startswith("Dense") else 'competition', count)
+        if table.empty:
+            st.info("No medals found for this selection.")
+        else:
+            plot(plot_ranking(table, f"{group}: {SCHEMES[scheme][0]}"))
+            st.dataframe(table, use_container_width=True, hide_index=True)
+    else:
+        st.warning("Historical data not loaded.")
+
+# Debug panel: where this rerun's time went, and cache hit rates over the
+# reruns that recorded timings
+if debug:
+    records = tracing.stop_recording()
+    with st.sidebar.expander("Stage Timings", expanded=True):
+        st.caption(f"This rerun: {(time.perf_counter() - rerun_start) * 1000:.0f} ms")
+        stages = [
+            {'Stage': name, 'Calls': stats['count'], 'ms': round(stats['seconds'] * 1000, 1)}
+            for name, stats in tracing.summarize(records).items() if stats['seconds'] is not None
+        ]
+        if stages:
+            st.dataframe(stages, use_container_width=True, hide_index=True)
+        rates = [
+            {'Cache': cache, 'Hits': hits, 'Misses': misses, 'Hit Rate': f"{hits / (hits + misses):.0%}"}
+            for cache, (hits, misses) in sorted(tracing.hit_rates().items()) if hits + misses
+        ]
+        if rates:
+            st.dataframe(rates, use_container_width=True, hide_index=True)
+        st.download_button("Download Metrics", tracing.prometheus_text(), file_name="olympic_metrics.txt")
@@ -1,9 +1,9 @@
-from prophet import Prophet
 import pandas as pd
 import plotly.graph_objects as go
-from historical_data import get_country_medal_counts
+from forecast_engine import forecast_series, iter_forecasts
+from forecasters import get_forecaster
 
-def predict_future_medals(medal_counts, country_code):
+def predict_future_medals(medal_counts, country_code, forecaster=None):
     if medal_counts is None or medal_counts.empty:
         print(f"No data available for {country_code}.")
         return
@@ -15,12 +15,17 @@ def predict_future_medals(medal_counts, country_code):
         print(f"Not enough data to predict for {country_code}.")
         return
 
-    model = Prophet()
-    model.fit(df)
+    # Repeat views of an unchanged series are served from the forecast cache
+    forecaster = get_forecaster(forecaster)
+    result = forecast_series(country_code, medal_counts['Year'].tolist(), medal_counts['Total'].tolist(), forecaster)
+    forecast = pd.DataFrame({
+        'ds': pd.to_datetime([str(y) for y in result['forecast_years']], format='%Y'),
+        'yhat': result['yhat'],
+        'yhat_lower': result['yhat_lower'],
+        'yhat_upper': result['yhat_upper'],
+    })
 
     next_year = df['ds'].dt.year.max() + 4
-    future = pd.date_range(start=df['ds'].max(), periods=2, freq='4YS')
-    forecast = model.predict(pd.DataFrame({'ds': future}))
 
     # Convert predictions and bounds to integers
     predicted_next = max(0, int(forecast.iloc[-1]['yhat']))
@@ -34,52 +39,43 @@ def predict_future_medals(medal_counts, country_code):
     fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_upper'].astype(int), mode='lines', name='Upper Bound', line=dict(dash='dot')))
     fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_lower'].astype(int), mode='lines', name='Lower Bound', line=dict(dash='dot')))
 
-    fig.update_layout(title=f"{country_code} Medal Forecast with Prophet",
+    fig.update_layout(title=f"{country_code} Medal Forecast with {forecaster.label}",
                       xaxis_title="Year",
                       yaxis_title="Total Medals")
-    fig.show()
-
-    print(f"\nProphet Prediction for {country_code} in {next_year}: {predicted_next} medals")
+    print(f"\n{forecaster.label} Prediction for {country_code} in {next_year}: {predicted_next} medals")
     print(f"Upper Bound: {yhat_upper} medals")
     print(f"Lower Bound: {yhat_lower} medals")
+    return fig
 
 
-def predict_multiple_countries_shared_plot(historical_df, country_codes):
+def predict_multiple_countries_shared_plot(historical_df, country_codes, forecaster=None, max_workers=None, on_update=None):
+    forecaster = get_forecaster(forecaster)
     fig = go.Figure()
+    fig.update_layout(title=f"{forecaster.label} Medal Predictions for Multiple Countries",
+                      xaxis_title="Year",
+                      yaxis_title="Total Medals",
+                      showlegend=True)
     future_preds = []
 
-    for code in country_codes:
-        medal_counts = get_country_medal_counts(historical_df, code)
-        if medal_counts is None or medal_counts.empty:
-            print(f"No data available for {code}.")
-            continue
-
-        df = medal_counts[['Year', 'Total']].rename(columns={'Year': 'ds', 'Total': 'y'})
-        df['ds'] = pd.to_datetime(df['ds'], format='%Y')
-
-        if len(df) < 2:
-            print(f"Not enough data to predict for {code}.")
+    # Traces are added as each country's forecast becomes available
+    for result in iter_forecasts(historical_df, country_codes, forecaster=forecaster, max_workers=max_workers):
+        code = result['code']
+        if 'error' in result:
+            print(result['error'])
             continue
 
-        model = Prophet()
-        model.fit(df)
-
-        next_year = df['ds'].dt.year.max() + 4
-        future = pd.date_range(start=df['ds'].max(), periods=2, freq='4YS')
-        forecast = model.predict(pd.DataFrame({'ds': future}))
-        predicted_next = max(0, int(forecast.iloc[-1]['yhat']))
+        history_ds = pd.to_datetime([str(y) for y in result['years']], format='%Y')
+        forecast_ds = pd.to_datetime([str(y) for y in result['forecast_years']], format='%Y')
+        predicted_next = max(0, int(result['yhat'][-1]))
 
-        fig.add_trace(go.Scatter(x=df['ds'], y=df['y'], mode='lines+markers', name=f'{code} Historical'))
-        fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], mode='lines', name=f'{code} Prediction'))
+        fig.add_trace(go.Scatter(x=history_ds, y=result['history'], mode='lines+markers', name=f'{code} Historical'))
+        fig.add_trace(go.Scatter(x=forecast_ds, y=result['yhat'], mode='lines', name=f'{code} Prediction'))
 
         future_preds.append((code, predicted_next))
+        if on_update is not None:
+            on_update(fig)
 
-    fig.update_layout(title="Prophet Medal Predictions for Multiple Countries",
-                      xaxis_title="Year",
-                      yaxis_title="Total Medals",
-                      showlegend=True)
-    fig.show()
-
-    print("\nProphet Medal Predictions:")
+    print(f"\n{forecaster.label} Medal Predictions:")
     for code, val in future_preds:
         print(f"{code}: {val} medals")
+    return fig
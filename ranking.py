@@ -0,0 +1,183 @@
+# ranking.py
+
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+import tracing
+from medal_cube import MEDALS
+
+ALL_TIME = 'All-time'
+POINTS = (3, 2, 1)
+METHODS = ('competition', 'dense')
+
+# Optional NOC,Population file for per-capita tables; none ships with the
+# dataset, so the scheme is offered only when one is present
+POPULATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'population.csv')
+
+# name -> (label, score column or None). Every scheme orders by its keys,
+# most significant first and larger is better; rows tie only when every key
+# is equal, and tied rows are listed by NOC code.
+SCHEMES = {
+    'gold': ('Gold first', None),
+    'total': ('Total medals', None),
+    'points': ('Weighted points (3-2-1)', 'Points'),
+    'per_capita': ('Medals per million people', 'Per Million'),
+}
+
+
+def read_populations(path=POPULATION_PATH):
+    # NOC -> population, or {} when the file is missing
+    if not os.path.exists(path):
+        return {}
+    populations = {}
+    with open(path, encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                populations[row['NOC'].strip()] = float(row['Population'])
+            except (KeyError, ValueError):
+                continue
+    return populations
+
+
+def scheme_keys(scheme, counts, population=None):
+    # (score, keys) for (n x medal) counts; score is None for the schemes
+    # that rank by the medal counts themselves
+    gold, silver, bronze = counts[:, 0], counts[:, 1], counts[:, 2]
+    total = counts.sum(axis=1)
+    if scheme == 'gold':
+        return None, [gold, silver, bronze]
+    if scheme == 'total':
+        return None, [total, gold, silver]
+    if scheme == 'points':
+        points = counts @ np.asarray(POINTS, dtype=counts.dtype)
+        return points, [points, gold, silver]
+    if scheme == 'per_capita':
+        per_million = total / (population / 1e6)
+        return per_million, [per_million, total, gold]
+    raise ValueError(f"Unknown ranking scheme '{scheme}'. Available: {', '.join(SCHEMES)}")
+
+
+def rank_sorted(group, keys):
+    # Competition (1-2-2-4) and dense (1-2-2-3) ranks of rows already
+    # sorted by group and then by keys, for every group in one pass
+    n = len(group)
+    idx = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = group[1:] != group[:-1]
+    new_value = new_group.copy()
+    for key in keys:
+        new_value[1:] |= key[1:] != key[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, idx, 0))
+    tie_start = np.maximum.accumulate(np.where(new_value, idx, 0))
+    competition = tie_start - group_start + 1
+    distinct = np.cumsum(new_value)
+    dense = distinct - distinct[group_start] + 1
+    return competition, dense
+
+
+def top_n(counts, n, scheme='gold', population=None):
+    # Positions of the best n rows of counts, best first, without sorting
+    # the rest: the candidates are partitioned out on the scheme's first
+    # key, keeping every row tied with the n-th, and only they are sorted
+    score, keys = scheme_keys(scheme, counts, population)
+    candidates = np.flatnonzero(counts.sum(axis=1))
+    if len(candidates) > n > 0:
+        first = keys[0][candidates]
+        cut = np.partition(first, len(first) - n)[len(first) - n]
+        candidates = candidates[first >= cut]
+    order = np.lexsort([candidates] + [-key[candidates] for key in reversed(keys)])
+    return candidates[order][:n]
+
+
+class Rankings:
+    # Ranking tables for many groups (every Games, or every sport) under
+    # every scheme, computed together: one lexsort per scheme over the rows
+    # of all groups, then ranks from where groups and keys change. A table
+    # is a slice of the precomputed arrays, so serving one costs only the
+    # frame it returns.
+
+    def __init__(self, groups, group, noc, counts, nocs, population=None):
+        # groups: group labels; group, noc: codes per row; counts: (rows x
+        # medal) counts; nocs: NOC labels; population: NOC -> population
+        self.groups = list(groups)
+        self._group_codes = {label: i for i, label in enumerate(self.groups)}
+        self.nocs = np.asarray(nocs, dtype=object)
+        keep = counts.sum(axis=1) > 0
+        group, noc, counts = group[keep], noc[keep], counts[keep]
+
+        people = None
+        self.schemes = ['gold', 'total', 'points']
+        if population:
+            people = np.array([population.get(code, np.nan) for code in self.nocs], dtype=float)[noc]
+            self.schemes.append('per_capita')
+
+        self._tables = {}
+        for scheme in self.schemes:
+            # Per-capita tables leave out NOCs without a population
+            rows = np.flatnonzero(~np.isnan(people)) if scheme == 'per_capita' else np.arange(len(group))
+            score, keys = scheme_keys(scheme, counts[rows], None if people is None else people[rows])
+            order = np.lexsort([noc[rows]] + [-key for key in reversed(keys)] + [group[rows]])
+            sorted_group = group[rows[order]]
+            competition, dense = rank_sorted(sorted_group, [key[order] for key in keys])
+            self._tables[scheme] = {
+                'noc': noc[rows[order]],
+                'counts': counts[rows[order]],
+                'score': None if score is None else score[order],
+                'competition': competition,
+                'dense': dense,
+                'offsets': np.searchsorted(sorted_group, np.arange(len(self.groups) + 1)),
+            }
+
+    @classmethod
+    @tracing.traced('aggregate.rankings_games')
+    def from_cube(cls, cube, population=None):
+        # One table per Games (year and season with medals), latest first,
+        # after an all-time table
+        per_games = np.transpose(cube.counts, (1, 2, 0, 3))
+        active = per_games.sum(axis=(2, 3)) > 0
+        years, seasons = np.nonzero(active[::-1, ::-1])
+        years, seasons = len(cube.years) - 1 - years, len(cube.seasons) - 1 - seasons
+        labels = [ALL_TIME] + [f"{cube.years[y]} {cube.seasons[s]}" for y, s in zip(years, seasons)]
+        counts = np.concatenate([cube.noc_totals[None], per_games[years, seasons]])
+        n_groups, n_nocs = counts.shape[:2]
+        return cls(labels, np.repeat(np.arange(n_groups), n_nocs), np.tile(np.arange(n_nocs), n_groups),
+                   counts.reshape(-1, len(MEDALS)), cube.nocs, population)
+
+    @classmethod
+    @tracing.traced('aggregate.rankings_sports')
+    def from_index(cls, index, mode='athlete', population=None):
+        # One table per sport, over all Games
+        counted = index.nation_rows if mode == 'nation' else index.medalled
+        rows = np.flatnonzero(counted)
+        n_nocs = len(index.nocs)
+        cell = (index.sport[rows].astype(np.int64) * n_nocs + index.noc[rows]) * len(MEDALS) + index.medal[rows]
+        counts = np.bincount(cell, minlength=len(index.sports) * n_nocs * len(MEDALS)).reshape(-1, len(MEDALS))
+        return cls(index.sports, np.repeat(np.arange(len(index.sports)), n_nocs),
+                   np.tile(np.arange(n_nocs), len(index.sports)), counts, index.nocs, population)
+
+    def table(self, group, scheme='gold', method='competition', n=None):
+        # Ranking table of one group. With n, the best n rows plus any tied
+        # with the n-th.
+        if scheme not in self._tables:
+            raise ValueError(f"Unknown ranking scheme '{scheme}'. Available: {', '.join(self.schemes)}")
+        if method not in METHODS:
+            raise ValueError(f"Unknown ranking method '{method}'. Available: {', '.join(METHODS)}")
+        t = self._tables[scheme]
+        i = self._group_codes[group]
+        lo, hi = t['offsets'][i], t['offsets'][i + 1]
+        if n is not None and hi - lo > n:
+            competition = t['competition'][lo:hi]
+            hi = lo + int(np.searchsorted(competition, competition[max(n, 1) - 1], side='right'))
+
+        counts = t['counts'][lo:hi]
+        data = pd.DataFrame(counts, columns=MEDALS)
+        data.insert(0, 'NOC', self.nocs[t['noc'][lo:hi]])
+        data.insert(0, 'Rank', t[method][lo:hi])
+        data['Total'] = counts.sum(axis=1)
+        column = SCHEMES[scheme][1]
+        if column:
+            data[column] = t['score'][lo:hi]
+        return data
@@ -0,0 +1,114 @@
+# render_cache.py
+
+import json
+import threading
+from collections import OrderedDict
+
+import tracing
+from medal_cube import as_medal_cube
+
+# Returned figures are shared between callers and must not be modified;
+# renderers apply the theme before a figure is stored.
+MAX_RENDERS = 256
+
+
+def _top_countries(cube):
+    from visualization import plot_interactive_medals
+    return plot_interactive_medals(cube)
+
+
+def _trend(cube, code):
+    from visualization import plot_country_medal_trend
+    return plot_country_medal_trend(cube.country_by_year(code), code)
+
+
+def _pie(cube, code):
+    from visualization import plot_country_pie
+    return plot_country_pie(cube, code)
+
+
+def _bar(cube, *codes):
+    from visualization import compare_countries
+    return compare_countries(cube, codes)
+
+
+def _radar(cube, *codes):
+    from visualization import radar_compare_multiple
+    return radar_compare_multiple(cube, codes)
+
+
+def _by_year(cube, *codes):
+    from visualization import plot_countries_by_year
+    return plot_countries_by_year(cube, codes)
+
+
+def _forecast(cube, code, forecaster=None):
+    from prediction import predict_future_medals
+    return predict_future_medals(cube.country_by_year(code), code, forecaster)
+
+
+RENDERERS = {
+    'top10': _top_countries,
+    'trend': _trend,
+    'pie': _pie,
+    'bar': _bar,
+    'radar': _radar,
+    'by_year': _by_year,
+    'forecast': _forecast,
+}
+
+
+def _arg_key(arg):
+    # Forecasters are keyed by their settings rather than by identity
+    params = getattr(arg, 'cache_params', None)
+    if params is not None:
+        return json.dumps(params, sort_keys=True)
+    return arg
+
+
+class RenderCache:
+    # Bounded LRU of rendered figures keyed by
+    # (renderer, arguments, data version, theme)
+
+    def __init__(self, max_entries=MAX_RENDERS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, kind, data, *args, theme=None):
+        cube = as_medal_cube(data)
+        key = (kind, tuple(_arg_key(a) for a in args), cube.version, theme)
+        with self._lock:
+            fig = self._entries.get(key)
+            if fig is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.count('render_cache.hit')
+                return fig
+            self.misses += 1
+        tracing.count('render_cache.miss')
+
+        with tracing.span(f'render.build.{kind}'):
+            fig = RENDERERS[kind](cube, *args)
+        if fig is None:
+            return None
+        if theme is not None:
+            fig.update_layout(template=theme)
+        with self._lock:
+            self._entries[key] = fig
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+render_cache = RenderCache()
+
+
+def render_figure(kind, data, *args, theme=None):
+    return render_cache.render(kind, data, *args, theme=theme)
@@ -0,0 +1,211 @@
+# tracing.py
+
+import json
+import os
+import threading
+import time
+
+# Tracing is off unless OLYMPIC_TRACE is set or enable() is called. While
+# off, span() hands back one shared no-op object and count() returns at
+# once, so instrumented code pays a function call and a flag check.
+# A thread that calls start_recording() is traced on its own until
+# stop_recording(), without turning tracing on for other threads.
+# OLYMPIC_TRACE_LOG=path additionally appends every span as a JSON line.
+_enabled = os.environ.get('OLYMPIC_TRACE', '') not in ('', '0')
+_log_path = os.environ.get('OLYMPIC_TRACE_LOG')
+_recording = 0   # threads currently recording
+
+_lock = threading.Lock()
+_spans = {}      # name -> [count, total seconds, max seconds]
+_counters = {}   # name -> count
+_local = threading.local()
+_log_file = None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def enable(log_path=None):
+    global _enabled, _log_path
+    if log_path is not None:
+        _log_path = log_path
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _active():
+    # Only consulted while some thread is recording
+    return _enabled or (_recording and getattr(_local, 'records', None) is not None)
+
+
+def span(name):
+    # with span('live.fetch'): ...
+    if not (_enabled or _recording and _active()):
+        return _NOOP
+    return _Span(name)
+
+
+def traced(name):
+    # Decorator form of span()
+    def decorate(func):
+        def wrapper(*args, **kwargs):
+            if not (_enabled or _recording and _active()):
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    if not (_enabled or _recording and _active()):
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    records = getattr(_local, 'records', None)
+    if records is not None:
+        records.append((name, None, n))
+
+
+def _record(name, seconds):
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            _spans[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+    records = getattr(_local, 'records', None)
+    if records is not None:
+        records.append((name, seconds, 1))
+    if _log_path:
+        _write_log({'ts': time.time(), 'span': name, 'seconds': round(seconds, 6),
+                    'thread': threading.current_thread().name})
+
+
+def _write_log(entry):
+    global _log_file
+    line = json.dumps(entry) + '\n'
+    with _lock:
+        try:
+            if _log_file is None or _log_file.name != _log_path:
+                _log_file = open(_log_path, 'a', buffering=1)
+            _log_file.write(line)
+        except OSError as e:
+            print(f"Could not write trace log: {e}")
+
+
+def start_recording():
+    # Collects the spans and counts made by the calling thread (one
+    # Streamlit rerun) until stop_recording() is called
+    global _recording
+    with _lock:
+        if getattr(_local, 'records', None) is None:
+            _recording += 1
+    _local.records = []
+
+
+def stop_recording():
+    global _recording
+    records = getattr(_local, 'records', None)
+    if records is not None:
+        with _lock:
+            _recording -= 1
+    _local.records = None
+    return records or []
+
+
+def summarize(records):
+    # {name: {'count', 'seconds'}} for a list of recorded spans and counts
+    summary = {}
+    for name, seconds, n in records:
+        entry = summary.setdefault(name, {'count': 0, 'seconds': None})
+        entry['count'] += n
+        if seconds is not None:
+            entry['seconds'] = (entry['seconds'] or 0.0) + seconds
+    return summary
+
+
+def snapshot():
+    with _lock:
+        spans = {name: {'count': c, 'seconds': total, 'max_seconds': longest}
+                 for name, (c, total, longest) in _spans.items()}
+        counters = dict(_counters)
+    return {'spans': spans, 'counters': counters}
+
+
+def hit_rates(counters=None):
+    # Caches count '<cache>.hit' and '<cache>.miss'; returns {cache: (hits, misses)}
+    counters = snapshot()['counters'] if counters is None else counters
+    caches = {}
+    for name, value in counters.items():
+        cache, _, outcome = name.rpartition('.')
+        if outcome in ('hit', 'miss'):
+            hits, misses = caches.get(cache, (0, 0))
+            caches[cache] = (hits + value, misses) if outcome == 'hit' else (hits, misses + value)
+    return caches
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def prometheus_text(prefix='olympic'):
+    # Prometheus text exposition format
+    data = snapshot()
+    lines = [
+        f"# HELP {prefix}_span_seconds Time spent in instrumented stages.",
+        f"# TYPE {prefix}_span_seconds summary",
+    ]
+    for name, stats in sorted(data['spans'].items()):
+        label = f'{{span="{_label(name)}"}}'
+        lines.append(f"{prefix}_span_seconds_count{label} {stats['count']}")
+        lines.append(f"{prefix}_span_seconds_sum{label} {stats['seconds']:.6f}")
+    lines += [
+        f"# HELP {prefix}_events_total Instrumented events such as cache hits.",
+        f"# TYPE {prefix}_events_total counter",
+    ]
+    for name, value in sorted(data['counters'].items()):
+        lines.append(f'{prefix}_events_total{{event="{_label(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
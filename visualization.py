@@ -2,15 +2,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from utils.colors import MEDAL_COLORS, COUNTRY_COLORS
+from medal_cube import as_medal_cube
 
 def plot_interactive_medals(df):
     if df is None or df.empty:
         print("No data available for plotting.")
         return
 
-    medal_counts = df.groupby('NOC')[['Gold', 'Silver', 'Bronze']].sum()
-    medal_counts['Total'] = medal_counts.sum(axis=1)
-    top_countries = medal_counts.sort_values(by='Total', ascending=False).head(10).reset_index()
+    top_countries = as_medal_cube(df).top_n(10)
 
     melted_df = top_countries.melt(id_vars='NOC', value_vars=['Gold', 'Silver', 'Bronze'],
                                    var_name='Medal', value_name='Count')
@@ -18,7 +17,7 @@ def plot_interactive_medals(df):
     fig = px.bar(melted_df, x='NOC', y='Count', color='Medal', barmode='group',
                  color_discrete_map=MEDAL_COLORS,
                  title='Top 10 Countries by Medal Count')
-    fig.show()
+    return fig
 
 def plot_country_medal_trend(medal_counts, country_code):
     if medal_counts is None or medal_counts.empty:
@@ -32,42 +31,49 @@ def plot_country_medal_trend(medal_counts, country_code):
         fig.update_traces(line=dict(color=line_color, width=3))
     else:
         fig.update_traces(line=dict(width=3))
-    fig.show()
+    return fig
 
 def plot_country_pie(df, country_code):
-    if df is None or df.empty or country_code not in df['NOC'].unique():
+    if df is None or df.empty or not as_medal_cube(df).has_country(country_code):
         print(f"No data available for {country_code}.")
         return
 
-    country_data = df[df['NOC'] == country_code][['Gold', 'Silver', 'Bronze']].sum()
+    country_data = as_medal_cube(df).country_totals(country_code)
     fig = px.pie(values=country_data.values, names=country_data.index,
                  title=f"{country_code} Medal Distribution",
                  color=country_data.index,
                  color_discrete_map=MEDAL_COLORS)
-    fig.show()
+    return fig
 
-def compare_two_countries(df, country1, country2):
+def _comparison_cube(df, country_codes):
+    # Returns the cube and the known codes, reporting any that are unknown
     if df is None or df.empty:
         print("No data available.")
+        return None, []
+
+    cube = as_medal_cube(df)
+    countries, unknown = cube.resolve(country_codes)
+    if unknown:
+        print(f"Country codes not found: {', '.join(unknown)}")
+    if not countries:
+        return None, []
+    return cube, countries
+
+def _country_color(country, i):
+    palette = px.colors.qualitative.Alphabet
+    return COUNTRY_COLORS.get(country, palette[i % len(palette)])
+
+def compare_countries(df, country_codes):
+    cube, countries = _comparison_cube(df, country_codes)
+    if cube is None:
         return
 
-    countries = [country1, country2]
-    if any(code not in df['NOC'].unique() for code in countries):
-        print("One or both country codes not found.")
-        return
-
-    data = df[df['NOC'].isin(countries)].groupby('NOC')[['Gold', 'Silver', 'Bronze']].sum()
-    data = data.reset_index()
-
-    fig = go.Figure()
+    data = cube.totals_frame(countries)
 
-    for medal in ['Gold', 'Silver', 'Bronze']:
-        fig.add_trace(go.Bar(
-            x=data['NOC'],
-            y=data[medal],
-            name=medal,
-            marker_color=MEDAL_COLORS[medal]
-        ))
+    fig = go.Figure([
+        go.Bar(x=data['NOC'], y=data[medal], name=medal, marker_color=MEDAL_COLORS[medal])
+        for medal in ['Gold', 'Silver', 'Bronze']
+    ])
 
     fig.update_layout(
         title='Country Comparison by Medal Type',
@@ -75,37 +81,106 @@ def compare_two_countries(df, country1, country2):
         xaxis_title='Country',
         yaxis_title='Medals'
     )
-    fig.show()
-
-def radar_compare_countries(df, country1, country2):
-    if df is None or df.empty:
-        print("No data available.")
-        return
+    return fig
 
-    countries = [country1, country2]
-    if any(code not in df['NOC'].unique() for code in countries):
-        print("One or both countries not found.")
+def radar_compare_multiple(df, country_codes):
+    cube, countries = _comparison_cube(df, country_codes)
+    if cube is None:
         return
 
-    medal_sums = df[df['NOC'].isin(countries)].groupby('NOC')[['Gold', 'Silver', 'Bronze']].sum()
     categories = ['Gold', 'Silver', 'Bronze']
+    medal_sums = cube.totals_frame(countries)[categories].to_numpy()
 
-    fig = go.Figure()
-
-    for country in countries:
-        values = medal_sums.loc[country].values.tolist()
-        values += values[:1]  # to close the radar chart
-        fig.add_trace(go.Scatterpolar(
-            r=values,
+    # to close the radar chart, each trace ends where it starts
+    fig = go.Figure([
+        go.Scatterpolar(
+            r=list(values) + [values[0]],
             theta=categories + [categories[0]],
             fill='toself',
             name=country,
-            line=dict(color=COUNTRY_COLORS.get(country, None))
-        ))
+            line=dict(color=_country_color(country, i))
+        )
+        for i, (country, values) in enumerate(zip(countries, medal_sums))
+    ])
 
     fig.update_layout(
         polar=dict(radialaxis=dict(visible=True)),
         title="Country Comparison Radar Chart",
         showlegend=True
     )
-    fig.show()
+    return fig
+
+def plot_countries_by_year(df, country_codes, columns=4):
+    cube, countries = _comparison_cube(df, country_codes)
+    if cube is None:
+        return
+
+    data = cube.countries_by_year(countries)
+    rows = -(-len(countries) // columns)
+    fig = px.bar(data, x='Year', y=['Gold', 'Silver', 'Bronze'],
+                 facet_col='NOC', facet_col_wrap=columns,
+                 category_orders={'NOC': countries},
+                 color_discrete_map=MEDAL_COLORS,
+                 labels={'value': 'Medals', 'variable': 'Medal'},
+                 title='Medals per Games by Country',
+                 height=max(400, 250 * rows))
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+    return fig
+
+def compare_two_countries(df, country1, country2):
+    return compare_countries(df, [country1, country2])
+
+def radar_compare_countries(df, country1, country2):
+    return radar_compare_multiple(df, [country1, country2])
+
+def plot_top_athletes(data, title='Top Athletes by Medal Count'):
+    if data is None or data.empty:
+        print("No data available for plotting.")
+        return
+
+    labels = data['Name'].astype(str) + ' (' + data['NOC'].astype(str) + ')'
+    fig = go.Figure([
+        go.Bar(y=labels, x=data[medal], name=medal, orientation='h', marker_color=MEDAL_COLORS[medal])
+        for medal in ['Gold', 'Silver', 'Bronze']
+    ])
+    fig.update_layout(title=title, barmode='stack', yaxis=dict(autorange='reversed'),
+                      xaxis_title='Medals', template='plotly_dark')
+    return fig
+
+def plot_sport_strength(strength, sport, top=15):
+    if strength is None or strength.empty:
+        print(f"No data available for {sport}.")
+        return
+
+    melted_df = strength.head(top).melt(id_vars='NOC', value_vars=['Gold', 'Silver', 'Bronze'],
+                                        var_name='Medal', value_name='Count')
+    fig = px.bar(melted_df, x='NOC', y='Count', color='Medal', barmode='stack',
+                 color_discrete_map=MEDAL_COLORS,
+                 title=f'Strongest Countries in {sport}')
+    return fig
+
+def plot_event_history(history, event):
+    if history is None or history.empty:
+        print(f"No data available for {event}.")
+        return
+
+    fig = px.scatter(history, x='Year', y='NOC', color='Medal', symbol='Season',
+                     color_discrete_map=MEDAL_COLORS,
+                     hover_data=[c for c in ('Name', 'Games') if c in history.columns],
+                     title=f'{event} Medallists by Games')
+    fig.update_traces(marker=dict(size=12))
+    return fig
+
+def plot_ranking(table, title):
+    if table is None or table.empty:
+        print("No data available for plotting.")
+        return
+
+    labels = table['Rank'].astype(str) + '. ' + table['NOC'].astype(str)
+    fig = go.Figure([
+        go.Bar(y=labels, x=table[medal], name=medal, orientation='h', marker_color=MEDAL_COLORS[medal])
+        for medal in ['Gold', 'Silver', 'Bronze']
+    ])
+    fig.update_layout(title=title, barmode='stack', yaxis=dict(autorange='reversed'),
+                      xaxis_title='Medals', template='plotly_dark')
+    return fig